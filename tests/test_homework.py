@@ -132,7 +132,10 @@ class TestPost:
             'Добавьте `text` для поиска модели административного сайта'
         )
 
-        assert 'pub_date' in admin_model.list_filter or 'created' in admin_model.list_filter, (
+        assert (
+            'pub_date' in admin_model.list_filter or 'created' in admin_model.list_filter
+            or admin_model.date_hierarchy in ('pub_date', 'created')
+        ), (
             f'Добавьте `pub_date` или `created` для фильтрации модели административного сайта'
         )
 
@@ -0,0 +1,59 @@
+from operator import attrgetter
+
+
+def _slug_or_none(post):
+    return post.group.slug if post.group_id else None
+
+
+def _url_or_none(post):
+    return post.image.url if post.image else None
+
+
+POST_FIELDS = {
+    'id': attrgetter('pk'),
+    'text': attrgetter('text'),
+    'pub_date': attrgetter('pub_date'),
+    'author': attrgetter('author.username'),
+    'group': _slug_or_none,
+    'image': _url_or_none,
+    'comments_count': attrgetter('comments_count'),
+}
+
+GROUP_FIELDS = {
+    'slug': attrgetter('slug'),
+    'title': attrgetter('title'),
+    'description': attrgetter('description'),
+    'posts_count': attrgetter('posts_count'),
+}
+
+COMMENT_FIELDS = {
+    'id': attrgetter('pk'),
+    'post': attrgetter('post_id'),
+    'author': attrgetter('author.username'),
+    'text': attrgetter('text'),
+    'created': attrgetter('created'),
+}
+
+FOLLOW_FIELDS = {
+    'id': attrgetter('pk'),
+    'user': attrgetter('user.username'),
+    'author': attrgetter('author.username'),
+}
+
+
+def parse_fields(value, fields):
+    """
+    Разбирает параметр ?fields=a,b для выборочной выдачи полей.
+     Вызывает ValueError для неизвестных полей.
+    """
+    if not value:
+        return tuple(fields)
+    requested = tuple(name.strip() for name in value.split(','))
+    unknown = [name for name in requested if name not in fields]
+    if unknown:
+        raise ValueError(f'Неизвестные поля: {", ".join(unknown)}')
+    return requested
+
+
+def serialize(obj, fields, requested):
+    return {name: fields[name](obj) for name in requested}
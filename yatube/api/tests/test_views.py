@@ -0,0 +1,220 @@
+import warnings
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import UnorderedObjectListWarning
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from posts.tests.utils import capture_on_commit_callbacks
+
+User = get_user_model()
+
+
+class ApiViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.POSTS_COUNT = 5
+
+        cls.user = User.objects.create_user(username='TestUsername')
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.group = Group.objects.create(
+            title='Тестовая группа 1',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        for post_number in range(cls.POSTS_COUNT):
+            cls.post = Post.objects.create(
+                text=f'Текст тестового поста #{post_number}',
+                author=cls.author,
+                group=cls.group,
+            )
+        cls.comment = Comment.objects.create(
+            post=cls.post,
+            author=cls.user,
+            text='Тестовый комментарий'
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_api_detail_endpoints(self):
+        """
+        Эндпоинты API отдают посты, группы и комментарии в JSON
+        """
+        urls_with_expected = [
+            (
+                reverse('api:post_detail', kwargs={'post_id': self.post.pk}),
+                {'id': self.post.pk, 'author': self.author.username,
+                 'group': self.group.slug, 'comments_count': 1},
+            ),
+            (
+                reverse('api:group_detail', kwargs={'slug': self.group.slug}),
+                {'slug': self.group.slug, 'posts_count': self.POSTS_COUNT},
+            ),
+        ]
+
+        for url, expected in urls_with_expected:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                data = response.json()
+                for field, value in expected.items():
+                    self.assertEqual(data[field], value)
+
+        response = self.guest_client.get(
+            reverse('api:comment_list', kwargs={'post_id': self.post.pk})
+        )
+        self.assertEqual(
+            [comment['id'] for comment in response.json()['results']],
+            [self.comment.pk]
+        )
+
+        response = self.guest_client.get(
+            reverse('api:post_detail', kwargs={'post_id': 0})
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    @override_settings(POSTS_DISPLAYED=2)
+    def test_api_post_list_cursor_pagination(self):
+        """
+        Список постов API постранично выдаётся по курсору
+        """
+        url = f'{reverse("api:post_list")}?author={self.author.username}'
+        seen_ids = []
+        while url:
+            data = self.guest_client.get(url).json()
+            self.assertLessEqual(len(data['results']), 2)
+            seen_ids += [post['id'] for post in data['results']]
+            url = data['next']
+
+        expected_ids = list(
+            Post.objects.filter(author=self.author).values_list(
+                'pk', flat=True
+            )
+        )
+        self.assertEqual(seen_ids, expected_ids)
+
+    def test_api_sparse_fieldsets(self):
+        """
+        Параметр fields ограничивает набор полей ответа
+        """
+        url = reverse('api:post_list')
+
+        response = self.guest_client.get(url, {'fields': 'id,author'})
+        for post in response.json()['results']:
+            self.assertEqual(set(post), {'id', 'author'})
+
+        response = self.guest_client.get(url, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+        # Пробелы после запятых не откладывают текст на запрос к строке.
+        queries = []
+        for fields in ('id,text', 'id, text'):
+            with CaptureQueriesContext(connection) as context:
+                response = self.guest_client.get(url, {'fields': fields})
+            self.assertEqual(
+                set(response.json()['results'][0]), {'id', 'text'}
+            )
+            queries.append(len(context))
+        self.assertEqual(queries[0], queries[1])
+
+    def test_api_lists_are_ordered(self):
+        """
+        Списки групп и подписок не вызывают UnorderedObjectListWarning
+        """
+        for url in (reverse('api:group_list'), reverse('api:follow_list')):
+            with self.subTest(url=url):
+                with warnings.catch_warnings(record=True) as caught:
+                    warnings.simplefilter('always')
+                    response = self.authorized_client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertFalse([
+                    warning for warning in caught
+                    if issubclass(warning.category, UnorderedObjectListWarning)
+                ])
+
+    def test_api_etag_not_modified(self):
+        """
+        Повторный запрос с If-None-Match получает 304, пока данные
+         не изменились
+        """
+        url = reverse('api:post_list')
+
+        response = self.guest_client.get(url)
+        etag = response['ETag']
+
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+        with capture_on_commit_callbacks():
+            Post.objects.create(text='Новый пост', author=self.author)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_api_etag_follows_comments(self):
+        """
+        Новый комментарий меняет ETag поста, его комментариев и списка
+         постов
+        """
+        urls = (
+            reverse('api:post_list'),
+            reverse('api:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('api:comment_list', kwargs={'post_id': self.post.pk}),
+        )
+        etags = {url: self.guest_client.get(url)['ETag'] for url in urls}
+
+        with capture_on_commit_callbacks():
+            comment = Comment.objects.create(
+                post=self.post, author=self.author, text='Новый комментарий'
+            )
+
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertNotEqual(response['ETag'], etags[url])
+        self.assertIn(
+            comment.pk,
+            [item['id'] for item in response.json()['results']]
+        )
+
+    def test_api_follow_list(self):
+        """
+        Подписки доступны только авторизованному пользователю
+        """
+        url = reverse('api:follow_list')
+
+        response = self.guest_client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+
+        response = self.authorized_client.get(url)
+        self.assertEqual(
+            response.json()['results'],
+            [{
+                'id': self.user.follower.get().pk,
+                'user': self.user.username,
+                'author': self.author.username,
+            }]
+        )
+
+    def test_api_is_read_only(self):
+        """
+        API не принимает изменяющие запросы
+        """
+        response = self.authorized_client.post(reverse('api:post_list'))
+        self.assertEqual(
+            response.status_code, HTTPStatus.METHOD_NOT_ALLOWED
+        )
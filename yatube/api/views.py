@@ -0,0 +1,153 @@
+from http import HTTPStatus
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.http import etag, require_safe
+
+from posts import feed_cache
+from posts.models import Comment, Group, Post
+from posts.paginators import CursorPaginator
+
+from .serializers import (COMMENT_FIELDS, FOLLOW_FIELDS, GROUP_FIELDS,
+                          POST_FIELDS, parse_fields, serialize)
+
+
+def json_response(data, status=HTTPStatus.OK):
+    return JsonResponse(
+        data, status=status, json_dumps_params={'ensure_ascii': False}
+    )
+
+
+def error_response(detail, status):
+    return json_response({'detail': detail}, status=status)
+
+
+def generation_etag(*keys):
+    """
+    ETag из поколений кеша и адреса запроса: считается до обращения
+     к базе, и при совпадении с If-None-Match клиент получает 304.
+     Ключ может быть функцией от аргументов view.
+    """
+    def etag_func(request, *args, **kwargs):
+        return feed_cache.make_etag(request, feed_cache.get_generations([
+            key(**kwargs) if callable(key) else key for key in keys
+        ]))
+    return etag(etag_func)
+
+
+def post_generation_key(post_id, **kwargs):
+    # Сбрасывается при изменении поста и его комментариев.
+    return feed_cache.object_generation_key('post', post_id)
+
+
+def get_limit(request):
+    try:
+        limit = int(request.GET.get('limit', settings.POSTS_DISPLAYED))
+    except ValueError:
+        limit = settings.POSTS_DISPLAYED
+    return min(max(limit, 1), settings.API_MAX_PAGE_SIZE)
+
+
+def page_url(request, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params['cursor'] = cursor
+    return request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+
+
+def list_response(request, queryset, fields, order_field):
+    try:
+        requested = parse_fields(request.GET.get('fields'), fields)
+    except ValueError as error:
+        return error_response(str(error), HTTPStatus.BAD_REQUEST)
+
+    paginator = CursorPaginator(queryset, get_limit(request), order_field)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+    return json_response({
+        'results': [serialize(obj, fields, requested) for obj in page_obj],
+        'next': page_url(request, paginator.next_cursor),
+        'previous': page_url(request, paginator.previous_cursor),
+    })
+
+
+def detail_response(request, obj, fields):
+    if obj is None:
+        return error_response('Не найдено', HTTPStatus.NOT_FOUND)
+    try:
+        requested = parse_fields(request.GET.get('fields'), fields)
+    except ValueError as error:
+        return error_response(str(error), HTTPStatus.BAD_REQUEST)
+    return json_response(serialize(obj, fields, requested))
+
+
+def posts_queryset(request):
+    posts = Post.objects.select_related('author', 'group')
+    try:
+        requested = parse_fields(request.GET.get('fields'), POST_FIELDS)
+    except ValueError:
+        # Ошибку в ответе вернёт list_response или detail_response.
+        return posts
+    if 'text' not in requested:
+        # Текст — самая тяжёлая колонка, без него строки заметно короче.
+        posts = posts.defer('text')
+    return posts
+
+
+@require_safe
+@generation_etag(
+    feed_cache.GENERATION_KEY, feed_cache.COMMENT_GENERATION_KEY
+)
+def post_list(request):
+    posts = posts_queryset(request)
+    if 'group' in request.GET:
+        posts = posts.filter(group__slug=request.GET['group'])
+    if 'author' in request.GET:
+        posts = posts.filter(author__username=request.GET['author'])
+    return list_response(request, posts, POST_FIELDS, '-pub_date')
+
+
+@require_safe
+@generation_etag(
+    feed_cache.GENERATION_KEY, feed_cache.BULK_GENERATION_KEY,
+    post_generation_key
+)
+def post_detail(request, post_id):
+    post = posts_queryset(request).filter(pk=post_id).first()
+    return detail_response(request, post, POST_FIELDS)
+
+
+@require_safe
+@generation_etag(
+    feed_cache.GENERATION_KEY, feed_cache.BULK_GENERATION_KEY,
+    post_generation_key
+)
+def comment_list(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        return error_response('Не найдено', HTTPStatus.NOT_FOUND)
+    comments = Comment.objects.filter(post_id=post_id).select_related('author')
+    return list_response(request, comments, COMMENT_FIELDS, 'created')
+
+
+@require_safe
+@generation_etag(feed_cache.GENERATION_KEY)
+def group_list(request):
+    return list_response(request, Group.objects.all(), GROUP_FIELDS, 'id')
+
+
+@require_safe
+@generation_etag(feed_cache.GENERATION_KEY)
+def group_detail(request, slug):
+    group = Group.objects.filter(slug=slug).first()
+    return detail_response(request, group, GROUP_FIELDS)
+
+
+@require_safe
+@generation_etag(feed_cache.FOLLOW_GENERATION_KEY)
+def follow_list(request):
+    if not request.user.is_authenticated:
+        return error_response(
+            'Требуется авторизация', HTTPStatus.UNAUTHORIZED
+        )
+    follows = request.user.follower.select_related('user', 'author')
+    return list_response(request, follows, FOLLOW_FIELDS, 'id')
@@ -0,0 +1,29 @@
+from django.contrib import admin
+
+from .models import SlowQuery
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = (
+        'shape', 'view', 'calls', 'average_time', 'max_time', 'full_scan',
+        'last_seen',
+    )
+    list_filter = ('full_scan', 'view')
+    search_fields = ('shape',)
+    readonly_fields = (
+        'view', 'shape', 'example', 'params_fingerprint', 'plan',
+        'full_scan', 'calls', 'total_time', 'max_time', 'first_seen',
+        'last_seen',
+    )
+    exclude = ('fingerprint',)
+
+    def average_time(self, obj):
+        return round(obj.average_time, 4)
+    average_time.short_description = 'Среднее время, с'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,23 @@
+import itertools
+
+from django.core.cache.backends.filebased import FileBasedCache
+
+
+class CullingFileCache(FileBasedCache):
+    """
+    Файловый кеш, который проверяет переполнение не при каждой записи,
+     а раз в OPTIONS['CULL_EVERY'] записей процесса: Django для этого
+     читает весь каталог, и с сотнями тысяч файлов листинг дороже
+     самой записи. Каталог может превысить MAX_ENTRIES не больше чем
+     на CULL_EVERY файлов на процесс.
+    """
+
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        options = params.get('OPTIONS', {})
+        self._cull_every = max(int(options.get('CULL_EVERY', 100)), 1)
+        self._writes = itertools.count(1)
+
+    def _cull(self):
+        if next(self._writes) % self._cull_every == 0:
+            super()._cull()
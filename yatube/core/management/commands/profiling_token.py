@@ -0,0 +1,25 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.profiling import make_token
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Выдаёт сотруднику токен для заголовка X-Profile: запросы '
+        'с ним профилируются независимо от выборки'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError('Нет такого пользователя')
+        if not user.is_staff:
+            raise CommandError('Токен выдаётся только сотрудникам')
+        self.stdout.write(make_token(user))
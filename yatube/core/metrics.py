@@ -0,0 +1,405 @@
+import fcntl
+import json
+import os
+import resource
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+from . import thumbnails
+
+# Метрики с адресами приложений из этих пространств имён считаются
+# по имени URL, остальные запросы — под одной меткой other.
+NAMESPACES = ('posts', 'users')
+OTHER_VIEW = 'other'
+
+REQUEST_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+THUMBNAIL_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+METRICS = {
+    'yatube_requests_total': (
+        'counter', 'Запросы по имени URL, методу и статусу'
+    ),
+    'yatube_request_duration_seconds': (
+        'histogram', 'Время ответа по имени URL'
+    ),
+    'yatube_db_queries_total': (
+        'counter', 'Запросы к базе по имени URL'
+    ),
+    'yatube_index_cache_total': (
+        'counter', 'Обращения к кешу ленты index: hit или miss'
+    ),
+    'yatube_thumbnail_generation_seconds': (
+        'histogram', 'Время создания миниатюр'
+    ),
+    'process_resident_memory_bytes': (
+        'gauge', 'Занятая процессом память'
+    ),
+}
+
+FILE_PREFIX = 'metrics_'
+# Сумма счётчиков завершившихся процессов.
+TOTAL_FILE = 'total.json'
+LOCK_FILE = '.lock'
+
+
+def process_memory():
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        # Вне Linux доступен только пик, в килобайтах.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _labels_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+class Registry:
+    """
+    Метрики одного процесса. Раз в METRICS_FLUSH_INTERVAL секунд они
+     записываются в свой файл каталога METRICS_DIR; /metrics читает
+     файлы всех процессов и складывает значения. Перед первой записью
+     процесс переносит файлы завершившихся процессов в общий итог.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.pid = os.getpid()
+            self.counters = {}
+            self.histograms = {}
+            self.flushed = 0
+            self.merged = False
+
+    def _check_fork(self):
+        # После fork дочерний процесс не должен повторять счётчики
+        # родителя под своим pid.
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.counters = {}
+            self.histograms = {}
+            self.merged = False
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _labels_key(labels))
+        with self.lock:
+            self._check_fork()
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, buckets, **labels):
+        key = (name, _labels_key(labels))
+        with self.lock:
+            self._check_fork()
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {
+                    'buckets': list(buckets),
+                    'counts': [0] * (len(buckets) + 1),
+                    'sum': 0,
+                }
+            histogram['counts'][bisect_left(buckets, value)] += 1
+            histogram['sum'] += value
+
+    def snapshot(self):
+        with self.lock:
+            self._check_fork()
+            return {
+                'pid': self.pid,
+                'memory': process_memory(),
+                'counters': [
+                    [name, dict(labels), value]
+                    for (name, labels), value in self.counters.items()
+                ],
+                'histograms': [
+                    [name, dict(labels), histogram]
+                    for (name, labels), histogram in self.histograms.items()
+                ],
+            }
+
+    def flush(self, force=False):
+        now = time.monotonic()
+        if not force and now - self.flushed < settings.METRICS_FLUSH_INTERVAL:
+            return
+        self.flushed = now
+        if not self.merged:
+            merge_finished()
+            self.merged = True
+        snapshot = self.snapshot()
+        _write(os.path.join(
+            settings.METRICS_DIR, f'{FILE_PREFIX}{snapshot["pid"]}.json'
+        ), snapshot)
+
+
+registry = Registry()
+
+
+def inc(name, value=1, **labels):
+    registry.inc(name, value, **labels)
+
+
+def observe(name, value, buckets, **labels):
+    registry.observe(name, value, buckets, **labels)
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Замена файла атомарна: читатель не увидит половину записи.
+    temp_path = f'{path}.{threading.get_ident()}.tmp'
+    with open(temp_path, 'w') as file:
+        json.dump(data, file)
+    os.replace(temp_path, path)
+
+
+def _read(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+@contextmanager
+def _locked(operation):
+    """
+    Блокировка каталога метрик: перенос в итог меняет два файла, и
+     читатель между ними посчитал бы одни и те же значения дважды.
+    """
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    with open(os.path.join(settings.METRICS_DIR, LOCK_FILE), 'a') as lock:
+        fcntl.flock(lock, operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _read_snapshots():
+    """Пары (путь, значения) из файлов процессов."""
+    try:
+        names = os.listdir(settings.METRICS_DIR)
+    except FileNotFoundError:
+        return
+    for name in names:
+        if not (name.startswith(FILE_PREFIX) and name.endswith('.json')):
+            continue
+        path = os.path.join(settings.METRICS_DIR, name)
+        snapshot = _read(path)
+        if snapshot is not None:
+            yield path, snapshot
+
+
+def _add(counters, histograms, snapshot):
+    for name, labels, value in snapshot['counters']:
+        key = (name, _labels_key(labels))
+        counters[key] = counters.get(key, 0) + value
+    for name, labels, histogram in snapshot['histograms']:
+        key = (name, _labels_key(labels))
+        total = histograms.setdefault(key, {
+            'buckets': histogram['buckets'],
+            'counts': [0] * len(histogram['counts']),
+            'sum': 0,
+        })
+        for number, count in enumerate(histogram['counts']):
+            total['counts'][number] += count
+        total['sum'] += histogram['sum']
+
+
+def merge_finished():
+    """
+    Переносит значения завершившихся процессов в общий итог и удаляет
+     их файлы, чтобы каталог не рос с каждым перезапуском воркеров.
+     Файл с pid текущего процесса остался от прежнего процесса с тем
+     же pid: без переноса первая запись затёрла бы его счётчики.
+    """
+    with _locked(fcntl.LOCK_EX):
+        counters = {}
+        histograms = {}
+        finished = []
+        for path, snapshot in _read_snapshots():
+            pid = snapshot['pid']
+            if pid == os.getpid() or not _is_alive(pid):
+                _add(counters, histograms, snapshot)
+                finished.append(path)
+        if not finished:
+            return
+        total_path = os.path.join(settings.METRICS_DIR, TOTAL_FILE)
+        total = _read(total_path)
+        if total is not None:
+            _add(counters, histograms, total)
+        _write(total_path, {
+            'counters': [
+                [name, dict(labels), value]
+                for (name, labels), value in counters.items()
+            ],
+            'histograms': [
+                [name, dict(labels), histogram]
+                for (name, labels), histogram in histograms.items()
+            ],
+        })
+        for path in finished:
+            os.remove(path)
+
+
+def collect():
+    """
+    Сумма метрик всех процессов и итога завершившихся, поэтому
+     значения не уменьшаются; память показывается только для живых.
+    """
+    registry.flush(force=True)
+    counters = {}
+    histograms = {}
+    gauges = {}
+    with _locked(fcntl.LOCK_SH):
+        total = _read(os.path.join(settings.METRICS_DIR, TOTAL_FILE))
+        snapshots = [snapshot for _, snapshot in _read_snapshots()]
+    if total is not None:
+        _add(counters, histograms, total)
+    for snapshot in snapshots:
+        _add(counters, histograms, snapshot)
+        if _is_alive(snapshot['pid']):
+            key = ('process_resident_memory_bytes',
+                   (('pid', str(snapshot['pid'])),))
+            gauges[key] = snapshot['memory']
+    return counters, histograms, gauges
+
+
+def _escape(value):
+    return (
+        str(value).replace('\\', r'\\').replace('\n', r'\n')
+        .replace('"', r'\"')
+    )
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(
+        f'{name}="{_escape(value)}"' for name, value in labels
+    ) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _histogram_lines(name, labels, histogram):
+    cumulative = 0
+    bounds = [*histogram['buckets'], '+Inf']
+    for bound, count in zip(bounds, histogram['counts']):
+        cumulative += count
+        yield (
+            f'{name}_bucket'
+            f'{_format_labels(labels + (("le", str(bound)),))} {cumulative}'
+        )
+    yield f'{name}_sum{_format_labels(labels)} ' \
+          f'{_format_value(histogram["sum"])}'
+    yield f'{name}_count{_format_labels(labels)} {cumulative}'
+
+
+def render(collected):
+    """Текстовый формат экспозиции Prometheus."""
+    counters, histograms, gauges = collected
+    lines = []
+    for name, (metric_type, help_text) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        for values in (counters, gauges):
+            for (metric, labels), value in sorted(values.items()):
+                if metric == name:
+                    lines.append(
+                        f'{name}{_format_labels(labels)} '
+                        f'{_format_value(value)}'
+                    )
+        for (metric, labels), histogram in sorted(
+            histograms.items(), key=lambda item: item[0]
+        ):
+            if metric == name:
+                lines.extend(_histogram_lines(name, labels, histogram))
+    return '\n'.join(lines) + '\n'
+
+
+def view_label(request):
+    match = request.resolver_match
+    if match is None or match.namespace not in NAMESPACES:
+        return OTHER_VIEW
+    return match.view_name
+
+
+def _observe_thumbnail(elapsed):
+    observe(
+        'yatube_thumbnail_generation_seconds', elapsed, THUMBNAIL_BUCKETS
+    )
+
+
+def install():
+    """Создание миниатюр считается и в фоновых потоках, и в запросах."""
+    thumbnails.on_thumbnail(_observe_thumbnail)
+
+
+def can_view(request):
+    """/metrics видят сотрудники и адреса из METRICS_ALLOWED_IPS."""
+    return (
+        request.user.is_staff
+        or request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+    )
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """Считает запросы, их время и обращения к базе по имени URL."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install()
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        queries = _QueryCounter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        view = view_label(request)
+        inc(
+            'yatube_requests_total', view=view, method=request.method,
+            status=str(response.status_code)
+        )
+        observe(
+            'yatube_request_duration_seconds', elapsed, REQUEST_BUCKETS,
+            view=view
+        )
+        if queries.count:
+            inc('yatube_db_queries_total', queries.count, view=view)
+        registry.flush()
+        return response
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=40, verbose_name='Отпечаток формы запроса')),
+                ('view', models.CharField(blank=True, max_length=200, verbose_name='View')),
+                ('shape', models.TextField(verbose_name='Форма запроса')),
+                ('example', models.TextField(verbose_name='Пример запроса')),
+                ('params_fingerprint', models.CharField(blank=True, max_length=16, verbose_name='Отпечаток параметров последнего запроса')),
+                ('plan', models.TextField(blank=True, verbose_name='План запроса')),
+                ('full_scan', models.BooleanField(default=False, verbose_name='Полный просмотр таблицы')),
+                ('calls', models.PositiveIntegerField(default=0, verbose_name='Число медленных вызовов')),
+                ('total_time', models.FloatField(default=0, verbose_name='Суммарное время, с')),
+                ('max_time', models.FloatField(default=0, verbose_name='Наибольшее время, с')),
+                ('first_seen', models.DateTimeField(auto_now_add=True, verbose_name='Впервые')),
+                ('last_seen', models.DateTimeField(auto_now=True, verbose_name='Последний раз')),
+            ],
+            options={
+                'verbose_name': 'Медленный запрос',
+                'verbose_name_plural': 'Медленные запросы',
+                'ordering': ('-total_time',),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='slowquery',
+            constraint=models.UniqueConstraint(fields=('fingerprint', 'view'), name='slowquery_fingerprint_view_unique'),
+        ),
+    ]
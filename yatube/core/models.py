@@ -0,0 +1,64 @@
+from django.db import models
+
+
+class SlowQuery(models.Model):
+    """Медленные запросы, сложенные по форме SQL и имени view."""
+    fingerprint = models.CharField(
+        max_length=40,
+        verbose_name='Отпечаток формы запроса'
+    )
+    view = models.CharField(
+        max_length=200,
+        blank=True,
+        verbose_name='View'
+    )
+    shape = models.TextField(verbose_name='Форма запроса')
+    example = models.TextField(verbose_name='Пример запроса')
+    params_fingerprint = models.CharField(
+        max_length=16,
+        blank=True,
+        verbose_name='Отпечаток параметров последнего запроса'
+    )
+    plan = models.TextField(blank=True, verbose_name='План запроса')
+    full_scan = models.BooleanField(
+        default=False,
+        verbose_name='Полный просмотр таблицы'
+    )
+    calls = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число медленных вызовов'
+    )
+    total_time = models.FloatField(
+        default=0,
+        verbose_name='Суммарное время, с'
+    )
+    max_time = models.FloatField(
+        default=0,
+        verbose_name='Наибольшее время, с'
+    )
+    first_seen = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Впервые'
+    )
+    last_seen = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Последний раз'
+    )
+
+    class Meta:
+        ordering = ('-total_time',)
+        verbose_name = 'Медленный запрос'
+        verbose_name_plural = 'Медленные запросы'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('fingerprint', 'view'),
+                name='slowquery_fingerprint_view_unique'
+            ),
+        )
+
+    def __str__(self) -> str:
+        return self.shape[:80]
+
+    @property
+    def average_time(self):
+        return self.total_time / self.calls if self.calls else 0
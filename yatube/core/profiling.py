@@ -0,0 +1,257 @@
+import heapq
+import json
+import logging
+import random
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.db import connections
+from django.template.base import Template
+
+from . import thumbnails
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'HTTP_X_PROFILE'
+TOKEN_SALT = 'core.profiling'
+SLOWEST_STATEMENTS = 5
+
+_current = ContextVar('profile', default=None)
+_installed = False
+_counted_backends = set()
+
+
+class Profile:
+    """Что успело произойти за время одного запроса."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = 0
+        self.sql_count = 0
+        self.sql_time = 0
+        self.statements = []
+        self.templates = defaultdict(float)
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.in_cache = False
+        self.thumbnails = 0
+        self.thumbnails_time = 0
+
+    def execute(self, execute, sql, params, many, context):
+        """Обёртка для connection.execute_wrapper."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.sql_count += 1
+            self.sql_time += elapsed
+            # Куча из самых медленных запросов не растёт с их числом.
+            item = (elapsed, self.sql_count, sql)
+            if len(self.statements) < SLOWEST_STATEMENTS:
+                heapq.heappush(self.statements, item)
+            else:
+                heapq.heappushpop(self.statements, item)
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    def server_timing(self):
+        metrics = [
+            f'total;dur={self.total * 1000:.1f}',
+            f'sql;dur={self.sql_time * 1000:.1f};'
+            f'desc="{self.sql_count} queries"',
+            f'cache;desc="{self.cache_hits} hits, '
+            f'{self.cache_misses} misses"',
+        ]
+        if self.thumbnails:
+            metrics.append(
+                f'thumbnails;dur={self.thumbnails_time * 1000:.1f};'
+                f'desc="{self.thumbnails} created"'
+            )
+        for number, (name, elapsed) in enumerate(self.templates.items()):
+            metrics.append(
+                f'tpl{number};dur={elapsed * 1000:.1f};desc="{name}"'
+            )
+        return ', '.join(metrics)
+
+    def record(self, request, response):
+        """Данные для структурной строки лога."""
+        return {
+            'method': request.method,
+            'path': request.path,
+            'view': getattr(request.resolver_match, 'view_name', None),
+            'status': response.status_code,
+            'total_ms': round(self.total * 1000, 2),
+            'sql_count': self.sql_count,
+            'sql_ms': round(self.sql_time * 1000, 2),
+            'slowest_sql': [
+                {'ms': round(elapsed * 1000, 2), 'sql': sql}
+                for elapsed, _, sql in sorted(self.statements, reverse=True)
+            ],
+            'templates_ms': {
+                name: round(elapsed * 1000, 2)
+                for name, elapsed in self.templates.items()
+            },
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'thumbnails': self.thumbnails,
+            'thumbnails_ms': round(self.thumbnails_time * 1000, 2),
+        }
+
+
+def _timed_render(render):
+    def wrapper(self, context):
+        profile = _current.get()
+        if profile is None:
+            return render(self, context)
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            # Время включает вложенные шаблоны, как в профилировщиках.
+            profile.templates[self.name or '<string>'] += (
+                time.perf_counter() - started
+            )
+    return wrapper
+
+
+_MISSING = object()
+
+
+def _counted_get(get):
+    def wrapper(self, key, default=None, version=None, **kwargs):
+        profile = _current.get()
+        if profile is None or profile.in_cache:
+            return get(self, key, default, version, **kwargs)
+        profile.in_cache = True
+        try:
+            value = get(self, key, _MISSING, version, **kwargs)
+        finally:
+            profile.in_cache = False
+        if value is _MISSING:
+            profile.cache_misses += 1
+            return default
+        profile.cache_hits += 1
+        return value
+    return wrapper
+
+
+def _counted_get_many(get_many):
+    def wrapper(self, keys, version=None, **kwargs):
+        profile = _current.get()
+        if profile is None or profile.in_cache:
+            return get_many(self, keys, version, **kwargs)
+        keys = list(keys)
+        # Реализация по умолчанию зовёт get на каждый ключ: их не считаем.
+        profile.in_cache = True
+        try:
+            values = get_many(self, keys, version, **kwargs)
+        finally:
+            profile.in_cache = False
+        profile.cache_hits += len(values)
+        profile.cache_misses += len(keys) - len(values)
+        return values
+    return wrapper
+
+
+def _count_thumbnail(elapsed):
+    profile = _current.get()
+    if profile is not None:
+        profile.thumbnails += 1
+        profile.thumbnails_time += elapsed
+
+
+def install():
+    """
+    Один раз оборачивает рендер шаблонов и создание миниатюр. Вне
+     профилируемого запроса обёртки только проверяют контекстную
+     переменную.
+    """
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    Template.render = _timed_render(Template.render)
+    thumbnails.on_thumbnail(_count_thumbnail)
+
+
+def count_cache_reads():
+    """
+    Оборачивает чтение в классах настроенных кешей. Бэкенд может
+     смениться вместе с настройками, поэтому проверка идёт на каждом
+     профилируемом запросе.
+    """
+    for alias in settings.CACHES:
+        backend = type(caches[alias])
+        if backend in _counted_backends:
+            continue
+        _counted_backends.add(backend)
+        backend.get = _counted_get(backend.get)
+        backend.get_many = _counted_get_many(backend.get_many)
+
+
+def make_token(user):
+    return signing.dumps(user.pk, salt=TOKEN_SALT)
+
+
+def has_valid_token(request):
+    """Подписанный заголовок X-Profile от сотрудника сайта."""
+    token = request.META.get(HEADER)
+    if not token or not request.user.is_staff:
+        return False
+    try:
+        user_id = signing.loads(
+            token, salt=TOKEN_SALT,
+            max_age=settings.PROFILING_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+    return user_id == request.user.pk
+
+
+class ProfilingMiddleware:
+    """
+    Профилирует долю PROFILING_SAMPLE_RATE запросов и каждый запрос
+     сотрудника с подписанным заголовком X-Profile. Итоги уходят
+     в заголовок Server-Timing и строкой JSON в лог core.profiling.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install()
+
+    def should_profile(self, request):
+        rate = settings.PROFILING_SAMPLE_RATE
+        if rate and random.random() < rate:
+            return True
+        return has_valid_token(request)
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        count_cache_reads()
+        profile = Profile()
+        token = _current.set(profile)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(profile.execute)
+                    )
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        profile.finish()
+
+        response['Server-Timing'] = profile.server_timing()
+        logger.info(json.dumps(
+            profile.record(request, response), ensure_ascii=False
+        ))
+        return response
@@ -0,0 +1,166 @@
+import hashlib
+import logging
+import re
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, connections, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .models import SlowQuery
+
+logger = logging.getLogger(__name__)
+
+STRING_RE = re.compile(r"'(?:''|[^'])*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDER_LIST_RE = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+SPACE_RE = re.compile(r'\s+')
+# В SQLite это SCAN без индекса, в PostgreSQL — Seq Scan.
+FULL_SCAN_RE = re.compile(
+    r'^\s*SCAN (?!.*USING (?:COVERING )?INDEX)|Seq Scan', re.MULTILINE
+)
+EXPLAINED = ('SELECT', 'WITH')
+# Имена точек сохранения уникальны, и каждая давала бы свою форму.
+IGNORED = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+
+def normalize(sql):
+    """
+    Форма запроса: литералы и параметры заменены, списки IN свёрнуты,
+     так что запросы с разными значениями складываются вместе.
+    """
+    shape = STRING_RE.sub('?', sql)
+    shape = NUMBER_RE.sub('?', shape)
+    shape = PLACEHOLDER_LIST_RE.sub('(...)', shape)
+    shape = shape.replace('%s', '?')
+    return SPACE_RE.sub(' ', shape).strip()
+
+
+def fingerprint(value):
+    return hashlib.sha1(value.encode()).hexdigest()
+
+
+def params_fingerprint(params):
+    return fingerprint(repr(params))[:16] if params else ''
+
+
+def _sqlite_plan(rows):
+    # Строки EXPLAIN QUERY PLAN: (id, parent, notused, detail).
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append('  ' * depth[node_id] + detail)
+    return '\n'.join(lines)
+
+
+def explain(connection, sql, params):
+    if not sql.lstrip().upper().startswith(EXPLAINED):
+        return ''
+    prefix = (
+        'EXPLAIN QUERY PLAN' if connection.vendor == 'sqlite' else 'EXPLAIN'
+    )
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}', params)
+            rows = cursor.fetchall()
+    except DatabaseError:
+        logger.exception('Не удалось получить план запроса')
+        return ''
+    if connection.vendor == 'sqlite':
+        return _sqlite_plan(rows)
+    return '\n'.join(str(row[0]) for row in rows)
+
+
+def record(connection, view, sql, params, elapsed):
+    """Добавляет медленный вызов к строке его формы запроса."""
+    shape = normalize(sql)
+    plan = explain(connection, sql, params)
+    values = {
+        'example': sql,
+        'params_fingerprint': params_fingerprint(params),
+        'plan': plan,
+        'full_scan': bool(FULL_SCAN_RE.search(plan)),
+    }
+    key = {'fingerprint': fingerprint(shape), 'view': view}
+    updated = SlowQuery.objects.filter(**key).update(
+        calls=F('calls') + 1,
+        total_time=F('total_time') + elapsed,
+        max_time=Greatest('max_time', elapsed),
+        **values
+    )
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            SlowQuery.objects.create(
+                shape=shape, calls=1, total_time=elapsed, max_time=elapsed,
+                **key, **values
+            )
+    except IntegrityError:
+        # Другой процесс успел создать строку: складываем в неё.
+        SlowQuery.objects.filter(**key).update(
+            calls=F('calls') + 1,
+            total_time=F('total_time') + elapsed,
+            max_time=Greatest('max_time', elapsed),
+        )
+
+
+class _SlowQueryCollector:
+    def __init__(self, connection, threshold):
+        self.connection = connection
+        self.threshold = threshold
+        self.slow = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            if (elapsed >= self.threshold and not many
+                    and not sql.startswith(IGNORED)):
+                self.slow.append((sql, params, elapsed))
+
+
+class SlowQueryMiddleware:
+    """
+    Запоминает запросы дольше SLOW_QUERY_THRESHOLD секунд и после
+     ответа сохраняет их с планом в SlowQuery и в лог. Планы строятся
+     вне обёртки, поэтому сами в журнал не попадают.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        threshold = settings.SLOW_QUERY_THRESHOLD
+        if threshold is None:
+            return self.get_response(request)
+
+        collectors = [
+            _SlowQueryCollector(connection, threshold)
+            for connection in connections.all()
+        ]
+        with ExitStack() as stack:
+            for collector in collectors:
+                stack.enter_context(
+                    collector.connection.execute_wrapper(collector)
+                )
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        view = match.view_name if match else ''
+        for collector in collectors:
+            for sql, params, elapsed in collector.slow:
+                logger.warning(
+                    'Медленный запрос %.1f мс во view %s: %s',
+                    elapsed * 1000, view or request.path, sql
+                )
+                try:
+                    record(collector.connection, view, sql, params, elapsed)
+                except DatabaseError:
+                    logger.exception('Не удалось сохранить медленный запрос')
+        return response
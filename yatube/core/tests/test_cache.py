@@ -0,0 +1,31 @@
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+
+from core.cache import CullingFileCache
+
+
+class CullingFileCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+
+    def test_cull_every(self):
+        """
+        Переполнение проверяется раз в CULL_EVERY записей, после
+         проверки в каталоге не больше MAX_ENTRIES файлов
+        """
+        cache = CullingFileCache(self.dir, {'OPTIONS': {
+            'MAX_ENTRIES': 4, 'CULL_FREQUENCY': 2, 'CULL_EVERY': 5,
+        }})
+
+        for number in range(4):
+            cache.set(f'key{number}', number)
+        self.assertEqual(len(os.listdir(self.dir)), 4)
+
+        cache.set('key4', 4)
+
+        self.assertLessEqual(len(os.listdir(self.dir)), 4)
+        self.assertEqual(cache.get('key4'), 4)
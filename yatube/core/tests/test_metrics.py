@@ -0,0 +1,164 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+from posts.models import Post
+
+User = get_user_model()
+
+METRICS_DIR = tempfile.mkdtemp()
+
+
+@override_settings(METRICS_DIR=METRICS_DIR)
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='TestUser')
+        Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(METRICS_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        metrics.registry.reset()
+        for name in os.listdir(METRICS_DIR):
+            os.remove(os.path.join(METRICS_DIR, name))
+
+    def get_metrics(self):
+        with self.settings(METRICS_ALLOWED_IPS=['127.0.0.1']):
+            response = self.client.get(reverse('metrics'))
+        self.assertEqual(
+            response['Content-Type'],
+            'text/plain; version=0.0.4; charset=utf-8'
+        )
+        return response.content.decode().splitlines()
+
+    def test_request_metrics(self):
+        """
+        Запросы, время ответа, обращения к базе и кеш ленты
+         считаются по имени URL
+        """
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('users:login'))
+        self.client.get('/missing-page/')
+
+        lines = self.get_metrics()
+
+        for line in (
+            'yatube_requests_total{method="GET",status="200",'
+            'view="posts:index"} 2',
+            'yatube_requests_total{method="GET",status="200",'
+            'view="users:login"} 1',
+            'yatube_requests_total{method="GET",status="404",'
+            'view="other"} 1',
+            'yatube_request_duration_seconds_count{view="posts:index"} 2',
+            'yatube_request_duration_seconds_bucket'
+            '{view="posts:index",le="+Inf"} 2',
+            'yatube_index_cache_total{result="hit"} 1',
+            'yatube_index_cache_total{result="miss"} 1',
+            '# TYPE yatube_thumbnail_generation_seconds histogram',
+        ):
+            with self.subTest(line=line):
+                self.assertIn(line, lines)
+        self.assertTrue(any(
+            line.startswith('yatube_db_queries_total{view="posts:index"}')
+            for line in lines
+        ))
+        self.assertIn(
+            f'process_resident_memory_bytes{{pid="{os.getpid()}"}}',
+            '\n'.join(lines)
+        )
+
+    def test_access(self):
+        """/metrics открыта сотрудникам и адресам из списка"""
+        staff = User.objects.create_user(username='staff', is_staff=True)
+
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+        self.client.logout()
+        self.get_metrics()
+
+    def write_snapshot(self, pid, count):
+        path = os.path.join(METRICS_DIR, f'metrics_{pid}.json')
+        with open(path, 'w') as file:
+            json.dump({
+                'pid': pid,
+                'memory': 1024,
+                'counters': [['yatube_requests_total', {
+                    'view': 'posts:index', 'method': 'GET', 'status': '200'
+                }, count]],
+                'histograms': [],
+            }, file)
+
+    def test_finished_processes_are_merged(self):
+        """
+        Файлы завершившихся процессов и прежнего процесса с тем же pid
+         переносятся в итог при первой записи, значения не уменьшаются
+        """
+        dead_pid = 2 ** 22 + 1
+        self.write_snapshot(dead_pid, 4)
+        self.write_snapshot(os.getpid(), 2)
+        metrics.inc('yatube_requests_total', view='posts:index',
+                    method='GET', status='200')
+        line = ('yatube_requests_total{method="GET",status="200",'
+                'view="posts:index"} 7')
+
+        self.assertIn(line, metrics.render(metrics.collect()))
+        self.assertEqual(
+            sorted(os.listdir(METRICS_DIR)),
+            sorted([metrics.LOCK_FILE, metrics.TOTAL_FILE,
+                    f'metrics_{os.getpid()}.json'])
+        )
+
+        metrics.registry.reset()
+        self.assertIn(line, metrics.render(metrics.collect()))
+
+    def test_processes_are_summed(self):
+        """
+        Значения из файлов других процессов складываются, память
+         завершившегося процесса не показывается
+        """
+        metrics.inc('yatube_requests_total', view='posts:index',
+                    method='GET', status='200')
+        dead_pid = 2 ** 22 + 1
+        self.write_snapshot(dead_pid, 4)
+
+        text = metrics.render(metrics.collect())
+
+        self.assertIn(
+            'yatube_requests_total{method="GET",status="200",'
+            'view="posts:index"} 5', text
+        )
+        self.assertNotIn(f'pid="{dead_pid}"', text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Корзины гистограммы накопительные, граница включается"""
+        for value in (0.05, 0.07, 3):
+            metrics.observe('yatube_thumbnail_generation_seconds', value,
+                            metrics.THUMBNAIL_BUCKETS)
+
+        text = metrics.render(metrics.collect())
+
+        for line in (
+            'yatube_thumbnail_generation_seconds_bucket{le="0.05"} 1',
+            'yatube_thumbnail_generation_seconds_bucket{le="0.1"} 2',
+            'yatube_thumbnail_generation_seconds_bucket{le="2.5"} 2',
+            'yatube_thumbnail_generation_seconds_bucket{le="+Inf"} 3',
+            'yatube_thumbnail_generation_seconds_count 3',
+        ):
+            with self.subTest(line=line):
+                self.assertIn(line, text.splitlines())
@@ -0,0 +1,101 @@
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import profiling
+from posts.models import Post
+
+User = get_user_model()
+
+
+class ProfilingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(
+            username='TestStaff', is_staff=True
+        )
+        cls.user = User.objects.create_user(username='TestUser')
+        Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def get_index(self, user=None, token=None):
+        if user is not None:
+            self.client.force_login(user)
+        headers = {'HTTP_X_PROFILE': token} if token else {}
+        return self.client.get(reverse('posts:index'), **headers)
+
+    def test_not_profiled_by_default(self):
+        """Без выборки и токена запрос не профилируется"""
+        response = self.get_index()
+        self.assertNotIn('Server-Timing', response)
+
+    def test_staff_token(self):
+        """
+        Запрос сотрудника с токеном получает Server-Timing и строку
+         JSON в логе с запросами, шаблонами и кешем
+        """
+        token = profiling.make_token(self.staff)
+        with self.assertLogs('core.profiling', 'INFO') as logs:
+            response = self.get_index(self.staff, token)
+
+        timing = response['Server-Timing']
+        self.assertIn('total;dur=', timing)
+        self.assertIn('desc="posts/index.html"', timing)
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts:index')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['sql_count'], 0)
+        self.assertLessEqual(
+            len(record['slowest_sql']), profiling.SLOWEST_STATEMENTS
+        )
+        self.assertIn('includes/post.html', record['templates_ms'])
+        self.assertGreater(record['cache_misses'], 0)
+
+    def test_invalid_tokens(self):
+        """
+        Токен не действует для другого пользователя, не сотрудника
+         и после подделки
+        """
+        cases = {
+            'other user': (self.staff, profiling.make_token(self.user)),
+            'not staff': (self.user, profiling.make_token(self.user)),
+            'tampered': (self.staff, profiling.make_token(self.staff) + 'x'),
+        }
+        for name, (user, token) in cases.items():
+            with self.subTest(name):
+                response = self.get_index(user, token)
+                self.assertNotIn('Server-Timing', response)
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_sampling(self):
+        """Выборка профилирует любые запросы, кеш считает попадания"""
+        with self.assertLogs('core.profiling', 'INFO') as logs:
+            self.get_index()
+            self.get_index()
+
+        first, second = (
+            json.loads(record.getMessage()) for record in logs.records
+        )
+        self.assertGreater(second['cache_hits'], first['cache_hits'])
+        self.assertLess(second['sql_count'], first['sql_count'])
+
+    def test_token_command(self):
+        """Команда выдаёт токен только сотрудникам"""
+        stdout = StringIO()
+        call_command('profiling_token', 'TestStaff', stdout=stdout)
+        self.assertEqual(
+            profiling.signing.loads(
+                stdout.getvalue().strip(), salt=profiling.TOKEN_SALT
+            ),
+            self.staff.pk
+        )
+        with self.assertRaises(CommandError):
+            call_command('profiling_token', 'TestUser')
@@ -0,0 +1,97 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.models import SlowQuery
+from core.slow_queries import FULL_SCAN_RE, normalize
+from posts.models import Follow, Post
+
+User = get_user_model()
+
+
+class SlowQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.author = User.objects.create_user(
+            username='TestAuthor', is_staff=True, is_superuser=True
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        Post.objects.create(author=cls.author, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_normalize(self):
+        """Значения заменяются, списки IN сворачиваются"""
+        self.assertEqual(
+            normalize(
+                'SELECT "a"."id" FROM "a" WHERE "a"."id" IN (%s, %s, %s)\n'
+                "  AND \"a\".\"name\" = 'O''Neil' LIMIT 21"
+            ),
+            'SELECT "a"."id" FROM "a" WHERE "a"."id" IN (...) '
+            'AND "a"."name" = ? LIMIT ?'
+        )
+        self.assertEqual(
+            normalize('SELECT * FROM "b" WHERE "b"."id" = %s'),
+            normalize('SELECT  * FROM "b" WHERE "b"."id" = 7')
+        )
+
+    def test_full_scan(self):
+        """Полный просмотр отличается от поиска и обхода по индексу"""
+        self.assertTrue(FULL_SCAN_RE.search('SCAN posts_post'))
+        self.assertTrue(FULL_SCAN_RE.search('Seq Scan on posts_post'))
+        self.assertFalse(FULL_SCAN_RE.search(
+            'SEARCH posts_post USING INDEX posts_post_author_id (author_id=?)'
+        ))
+        self.assertFalse(FULL_SCAN_RE.search(
+            'SCAN posts_post USING INDEX posts_post_pub_date_idx'
+        ))
+
+    @override_settings(SLOW_QUERY_THRESHOLD=0)
+    def test_slow_queries_are_aggregated(self):
+        """
+        Медленные запросы сохраняются с view и планом, повторы
+         складываются в одну строку формы запроса
+        """
+        with self.assertLogs('core.slow_queries', 'WARNING'):
+            self.client.get(reverse('posts:follow_index'))
+        shapes = SlowQuery.objects.filter(view='posts:follow_index').count()
+        with self.assertLogs('core.slow_queries', 'WARNING'):
+            self.client.get(reverse('posts:follow_index'))
+
+        queries = SlowQuery.objects.filter(view='posts:follow_index')
+        self.assertEqual(queries.count(), shapes)
+        timeline = queries.get(shape__contains='posts_timelineentry')
+        self.assertEqual(timeline.calls, 2)
+        self.assertGreaterEqual(timeline.max_time, 0)
+        self.assertTrue(timeline.params_fingerprint)
+        if connection.vendor == 'sqlite':
+            self.assertIn('posts_timelineentry', timeline.plan)
+
+    def test_fast_queries_are_not_saved(self):
+        """Запросы быстрее порога не сохраняются"""
+        self.client.get(reverse('posts:follow_index'))
+        self.assertFalse(SlowQuery.objects.exists())
+
+    @override_settings(SLOW_QUERY_THRESHOLD=0)
+    def test_admin(self):
+        """Медленные запросы видны в админке"""
+        with self.assertLogs('core.slow_queries', 'WARNING'):
+            self.client.get(reverse('posts:index'))
+        self.client.force_login(self.author)
+        with self.assertLogs('core.slow_queries', 'WARNING'):
+            response = self.client.get(
+                reverse('admin:core_slowquery_changelist')
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'posts:index')
+        query = SlowQuery.objects.first()
+        with self.assertLogs('core.slow_queries', 'WARNING'):
+            response = self.client.get(
+                reverse('admin:core_slowquery_change', args=(query.pk,))
+            )
+        self.assertEqual(response.status_code, 200)
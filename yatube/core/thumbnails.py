@@ -0,0 +1,35 @@
+import threading
+import time
+
+from sorl.thumbnail.base import ThumbnailBackend
+
+_listeners = []
+_lock = threading.Lock()
+
+
+def _timed(create_thumbnail):
+    def wrapper(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return create_thumbnail(self, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            for listener in _listeners:
+                listener(elapsed)
+    return wrapper
+
+
+def on_thumbnail(listener):
+    """
+    Передаёт listener время создания каждой миниатюры. Метод sorl
+     оборачивается один раз на всех слушателей: метрикам и
+     профилированию не нужно оборачивать его поверх друг друга.
+    """
+    with _lock:
+        if listener in _listeners:
+            return
+        if not _listeners:
+            ThumbnailBackend._create_thumbnail = _timed(
+                ThumbnailBackend._create_thumbnail
+            )
+        _listeners.append(listener)
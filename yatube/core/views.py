@@ -1,5 +1,9 @@
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
 from django.shortcuts import render
 
+from . import metrics as metrics_store
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -11,3 +15,12 @@ def csrf_failure(request, exception):
 
 def handler500(request):
     return render(request, 'core/500.html', {'path': request.path}, status=500)
+
+
+def metrics(request):
+    if not metrics_store.can_view(request):
+        raise PermissionDenied
+    return HttpResponse(
+        metrics_store.render(metrics_store.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -1,10 +1,71 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import PAGE_VAR
 
+from . import search
 from .models import Comment, Follow, Group, Post
+from .paginators import EstimatedCountPaginator
+
+
+class InputFilter(admin.SimpleListFilter):
+    """
+    Фильтр с полем ввода: не перечисляет в боковой панели
+     всех пользователей или все посты.
+    """
+    template = 'admin/input_filter.html'
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        yield {
+            'value': self.value() or '',
+            'hidden_params': [
+                (name, value) for name, value in changelist.params.items()
+                if name not in (self.parameter_name, PAGE_VAR)
+            ],
+        }
+
+
+class UsernameFilter(InputFilter):
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(
+                **{f'{self.parameter_name}__username': self.value()}
+            )
+
+
+class AuthorFilter(UsernameFilter):
+    title = 'автору (имя пользователя)'
+    parameter_name = 'author'
+
+
+class FollowerFilter(UsernameFilter):
+    title = 'подписчику (имя пользователя)'
+    parameter_name = 'user'
+
+
+class PostFilter(InputFilter):
+    title = 'посту (id)'
+    parameter_name = 'post'
+
+    def queryset(self, request, queryset):
+        if self.value():
+            if not self.value().isdigit():
+                return queryset.none()
+            return queryset.filter(post_id=self.value())
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Списки без COUNT(*) по всей таблице на каждой странице."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(LargeTableAdmin):
     list_display = (
         'pk',
         'text',
@@ -13,10 +74,21 @@ class PostAdmin(admin.ModelAdmin):
         'group',
     )
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
-    list_filter = ('pub_date',)
+    list_filter = (AuthorFilter,)
+    date_hierarchy = 'pub_date'
+    autocomplete_fields = ('author',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по индексу вместо LIKE '%...%' по всей таблице.
+        if not search_term:
+            return queryset, False
+        return search.search_posts(
+            queryset, search_term, with_comments=False
+        ), False
+
 
 @admin.register(Group)
 class GroupAdmin(admin.ModelAdmin):
@@ -24,13 +96,14 @@ class GroupAdmin(admin.ModelAdmin):
         'title',
         'slug',
         'description',
+        'posts_count',
     )
     search_fields = ('title', 'description',)
     empty_value_display = '-пусто-'
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
     list_display = (
         'pk',
         'post',
@@ -38,19 +111,31 @@ class CommentAdmin(admin.ModelAdmin):
         'text',
         'created'
     )
+    list_select_related = ('post', 'author')
 
     search_fields = ('text',)
-    list_filter = ('created', 'post', 'author')
+    list_filter = (PostFilter, AuthorFilter)
+    date_hierarchy = 'created'
+    raw_id_fields = ('post',)
+    autocomplete_fields = ('author',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return search.search_comments(queryset, search_term), False
+
 
 @admin.register(Follow)
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(LargeTableAdmin):
     list_display = (
         'pk',
         'user',
         'author'
     )
+    list_select_related = ('user', 'author')
+    ordering = ('-pk',)
 
-    list_filter = ('user', 'author')
+    list_filter = (FollowerFilter, AuthorFilter)
+    autocomplete_fields = ('user', 'author')
     empty_value_display = '-пусто-'
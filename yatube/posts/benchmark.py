@@ -0,0 +1,196 @@
+import math
+import subprocess
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+# Обработчик прогресса SQLite вызывается раз в столько инструкций.
+PROGRESS_STEPS = 100
+REGRESSION_THRESHOLD = 1.1
+
+
+def percentile(values, percent):
+    """Перцентиль по ближайшему рангу: значение из самой выборки."""
+    values = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class DatabaseSteps:
+    """
+    Счётчик шагов виртуальной машины SQLite: растёт с числом
+     прочитанных строк и индексных записей. На других базах — None.
+    """
+
+    def __init__(self):
+        self.steps = 0
+
+    def _count(self):
+        self.steps += PROGRESS_STEPS
+        return 0
+
+    def __enter__(self):
+        if connection.vendor != 'sqlite':
+            self.steps = None
+            return self
+        connection.ensure_connection()
+        connection.connection.set_progress_handler(
+            self._count, PROGRESS_STEPS
+        )
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.steps is not None:
+            connection.connection.set_progress_handler(None, 0)
+
+
+class Scenario:
+    """Участники замеров: самые нагруженные объекты набора данных."""
+
+    def __init__(self):
+        self.reader = UserStats.objects.order_by(
+            '-following_count'
+        ).select_related('user').first().user
+        self.author = UserStats.objects.order_by(
+            '-followers_count'
+        ).select_related('user').first().user
+        self.group = Group.objects.order_by('-posts_count').first()
+        self.post = (
+            self.author.posts.order_by('-comments_count').first()
+            or Post.objects.order_by('-comments_count').first()
+        )
+        # На малых наборах читатель бывает подписан на всех: тогда
+        # отписка замеряется первой, и подписка возвращает всё как было.
+        others = User.objects.exclude(pk=self.reader.pk)
+        self.target = (
+            others.exclude(following__user=self.reader).first()
+            or others.first()
+        )
+        self.following = Follow.objects.filter(
+            user=self.reader, author=self.target
+        ).exists()
+
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def views(self):
+        """(имя, метод, адрес, данные) для каждого замеряемого view."""
+        post_id = self.post.pk
+        target = self.target.username
+        views = [
+            ('index', 'get', reverse('posts:index'), None),
+            ('group_list', 'get',
+             reverse('posts:group_list', args=(self.group.slug,)), None),
+            ('profile', 'get',
+             reverse('posts:profile', args=(self.author.username,)), None),
+            ('post_detail', 'get',
+             reverse('posts:post_detail', args=(post_id,)), None),
+            ('post_comments', 'get',
+             reverse('posts:post_comments', args=(post_id,)),
+             {'format': 'json'}),
+            ('follow_index', 'get', reverse('posts:follow_index'), None),
+            ('search', 'get', reverse('posts:search'), {'q': 'кофе'}),
+            ('post_create', 'post', reverse('posts:post_create'),
+             {'text': 'Пост из замера производительности'}),
+            ('add_comment', 'post',
+             reverse('posts:add_comment', args=(post_id,)),
+             {'text': 'Комментарий из замера'}),
+        ]
+        follow = [
+            ('profile_follow', 'get',
+             reverse('posts:profile_follow', args=(target,)), None),
+            ('profile_unfollow', 'get',
+             reverse('posts:profile_unfollow', args=(target,)), None),
+        ]
+        return views + (follow[::-1] if self.following else follow)
+
+    def cleanup(self):
+        """Убирает созданное замерами, чтобы размер набора не менялся."""
+        for post in self.reader.posts.filter(
+            text='Пост из замера производительности'
+        ):
+            post.delete()
+        for comment in Comment.objects.filter(
+            post=self.post, text='Комментарий из замера'
+        ):
+            comment.delete()
+
+
+def measure(client, method, url, data):
+    with CaptureQueriesContext(connection) as queries, \
+            DatabaseSteps() as steps:
+        started = time.perf_counter()
+        response = getattr(client, method)(url, data)
+        elapsed = time.perf_counter() - started
+    if response.status_code >= 400:
+        raise RuntimeError(f'{url}: ответ {response.status_code}')
+    return elapsed * 1000, len(queries), steps.steps
+
+
+def run_views(repeat):
+    """
+    Замеряет все view на текущих данных. Каждый повтор проходит по всем
+     view по очереди, так что чтения идут после записей прошлого круга.
+    """
+    scenario = Scenario()
+    views = scenario.views()
+    samples = {name: [] for name, *_ in views}
+    for _ in range(repeat):
+        for name, method, url, data in views:
+            samples[name].append(measure(scenario.client, method, url, data))
+    scenario.cleanup()
+
+    results = []
+    for name, runs in samples.items():
+        latencies = [latency for latency, _, _ in runs]
+        steps = [value for _, _, value in runs]
+        results.append({
+            'view': name,
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p90_ms': round(percentile(latencies, 90), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'max_ms': round(max(latencies), 3),
+            'queries': max(queries for _, queries, _ in runs),
+            'db_steps': None if None in steps else percentile(steps, 50),
+        })
+    return results
+
+
+def compare(baseline, current):
+    """
+    Строки сравнения с прошлым прогоном: (размер, view, старое p50,
+     новое p50, отношение, признак регрессии).
+    """
+    old = {
+        (row['size'], row['view']): row for row in baseline['results']
+    }
+    rows = []
+    for row in current['results']:
+        previous = old.get((row['size'], row['view']))
+        if previous is None:
+            continue
+        ratio = row['p50_ms'] / max(previous['p50_ms'], 1e-6)
+        rows.append((
+            row['size'], row['view'], previous['p50_ms'], row['p50_ms'],
+            ratio, ratio > REGRESSION_THRESHOLD
+            or row['queries'] > previous['queries'],
+        ))
+    return rows
@@ -0,0 +1,93 @@
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+
+def _change(queryset, **deltas):
+    return queryset.update(**{
+        field: F(field) + delta for field, delta in deltas.items()
+    })
+
+
+def change_user_stats(user_id, **deltas):
+    """Сдвигает счётчики пользователя на заданные величины."""
+    _change(UserStats.objects.filter(user_id=user_id), **deltas)
+
+
+def change_group_posts(group_id, delta):
+    if group_id is not None:
+        _change(Group.objects.filter(pk=group_id), posts_count=delta)
+
+
+def change_post_comments(post_id, delta):
+    _change(Post.objects.filter(pk=post_id), comments_count=delta)
+
+
+def _change_many(queryset, key, field, deltas):
+    """
+    Сдвигает счётчик у многих строк: deltas — {значение key: сдвиг},
+     один UPDATE на каждую встретившуюся величину сдвига.
+    """
+    keys_by_delta = defaultdict(list)
+    for value, delta in deltas.items():
+        if value is not None and delta:
+            keys_by_delta[delta].append(value)
+    for delta, values in keys_by_delta.items():
+        _change(queryset.filter(**{f'{key}__in': values}), **{field: delta})
+
+
+def change_many_user_stats(field, deltas):
+    _change_many(UserStats.objects, 'user_id', field, deltas)
+
+
+def change_many_group_posts(deltas):
+    _change_many(Group.objects, 'pk', 'posts_count', deltas)
+
+
+def change_many_post_comments(deltas):
+    _change_many(Post.objects, 'pk', 'comments_count', deltas)
+
+
+def _count(queryset, field, outer_field='pk'):
+    """Подзапрос с числом строк queryset, ссылающихся на внешнюю строку."""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef(outer_field)})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+def recount_user_stats(users):
+    UserStats.objects.bulk_create(
+        [
+            UserStats(user_id=user_id)
+            for user_id in users.filter(
+                stats__isnull=True
+            ).values_list('pk', flat=True)
+        ],
+        ignore_conflicts=True
+    )
+    UserStats.objects.filter(user__in=users).update(
+        posts_count=_count(Post.objects, 'author', 'user_id'),
+        followers_count=_count(Follow.objects, 'author', 'user_id'),
+        following_count=_count(Follow.objects, 'user', 'user_id'),
+    )
+
+
+def recount_all():
+    """Пересчитывает все счётчики по фактическим данным."""
+    Group.objects.update(posts_count=_count(Post.objects, 'group'))
+    Post.objects.update(comments_count=_count(Comment.objects, 'post'))
+    recount_user_stats(User.objects.all())
@@ -0,0 +1,217 @@
+import csv
+import json
+
+from django.db.models import Q
+
+from .importer import COMMENT, FOLLOW, GROUP, POST, RECORD_TYPES
+from .models import Comment, Follow, Group, Post
+
+BATCH_SIZE = 1000
+
+# Поля выгрузки: имя в файле -> путь в ORM. Имена совпадают с теми,
+# что понимает import_posts.
+EXPORTS = {
+    GROUP: (Group.objects, {
+        'id': 'pk',
+        'slug': 'slug',
+        'title': 'title',
+        'description': 'description',
+    }),
+    POST: (Post.objects, {
+        'id': 'pk',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'image': 'image',
+    }),
+    COMMENT: (Comment.objects, {
+        'id': 'pk',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+    }),
+    FOLLOW: (Follow.objects, {
+        'id': 'pk',
+        'user': 'user__username',
+        'author': 'author__username',
+    }),
+}
+
+# Комментарии внутри записи поста: при импорте в другую базу посты
+# получают новые id, и ссылка по id поста указала бы не туда.
+NESTED_COMMENT_FIELDS = {
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+
+
+def _value(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def iter_comments(first_post_id, last_post_id, batch_size=BATCH_SIZE):
+    """
+    Пары (id поста, комментарий) для постов с id в заданных границах
+     в порядке (пост, дата, id). Пачки читаются по ключу по индексу
+     comment_post_created_idx, в памяти не больше batch_size строк,
+     сколько бы комментариев ни было у одного поста.
+    """
+    names = list(NESTED_COMMENT_FIELDS)
+    comments = Comment.objects.filter(
+        post_id__gte=first_post_id, post_id__lte=last_post_id
+    ).order_by('post_id', 'created', 'pk')
+    after = Q()
+    while True:
+        batch = list(comments.filter(after).values_list(
+            'post_id', 'created', 'pk', *NESTED_COMMENT_FIELDS.values()
+        )[:batch_size])
+        for post_id, _, _, *row in batch:
+            yield post_id, dict(zip(names, map(_value, row)))
+        if len(batch) < batch_size:
+            return
+        post_id, created, pk = batch[-1][:3]
+        after = Q(post_id__gt=post_id) | Q(
+            post_id=post_id, created__gt=created
+        ) | Q(post_id=post_id, created=created, pk__gt=pk)
+
+
+class _CommentStream:
+    """Делит общий поток комментариев пачки между записями постов."""
+
+    def __init__(self, comments):
+        self.comments = comments
+        self.current = next(comments, None)
+
+    def of_post(self, post_id):
+        while self.current is not None and self.current[0] <= post_id:
+            if self.current[0] == post_id:
+                yield self.current[1]
+            self.current = next(self.comments, None)
+
+
+def nest_comments(records, batch_size=BATCH_SIZE):
+    """
+    Добавляет в записи постов ленивые итераторы их комментариев из
+     одного потока на всю пачку. Записи нужно обходить по порядку,
+     дочитывая comments каждой до перехода к следующей.
+    """
+    stream = _CommentStream(iter_comments(
+        records[0]['id'], records[-1]['id'], batch_size
+    ))
+    for record in records:
+        record['comments'] = stream.of_post(record['id'])
+
+
+def iter_records(record_type, batch_size=BATCH_SIZE, nested=False):
+    """
+    Записи одного типа по возрастанию id. Каждая пачка — отдельный
+     запрос по ключу (id > последнего), поэтому память не растёт,
+     а длинная транзакция или курсор не держатся открытыми. С nested
+     у постов есть comments — итератор их комментариев (nest_comments).
+    """
+    queryset, fields = EXPORTS[record_type]
+    names = list(fields)
+    last_pk = 0
+    while True:
+        batch = list(
+            queryset.filter(pk__gt=last_pk).order_by('pk').values_list(
+                *fields.values()
+            )[:batch_size]
+        )
+        records = [
+            {'type': record_type, **dict(zip(names, map(_value, row)))}
+            for row in batch
+        ]
+        if nested and records:
+            nest_comments(records, batch_size)
+        yield from records
+        if len(batch) < batch_size:
+            return
+        last_pk = batch[-1][0]
+
+
+def iter_all(record_types, batch_size=BATCH_SIZE):
+    # Порядок как при импорте: группы и посты раньше ссылок на них.
+    # Вместе с постами комментарии выгружаются внутри их записей.
+    nested = POST in record_types and COMMENT in record_types
+    for record_type in RECORD_TYPES:
+        if record_type == COMMENT and nested:
+            continue
+        if record_type in record_types:
+            yield from iter_records(
+                record_type, batch_size, nested=record_type == POST and nested
+            )
+
+
+class _Echo:
+    """Файлоподобный объект для csv.writer: возвращает строку как есть."""
+
+    def write(self, value):
+        return value
+
+
+def _json_pieces(comments):
+    """Массив JSON по частям, без сборки всего массива в памяти."""
+    yield '['
+    for number, comment in enumerate(comments):
+        yield (', ' if number else '') + json.dumps(
+            comment, ensure_ascii=False
+        )
+    yield ']'
+
+
+def _jsonl_record(record):
+    comments = record.pop('comments', None)
+    line = json.dumps(record, ensure_ascii=False)
+    if comments is None:
+        yield line + '\n'
+        return
+    # Комментарии идут последним ключом объекта.
+    yield line[:-1] + ', "comments": '
+    yield from _json_pieces(comments)
+    yield '}\n'
+
+
+def _csv_record(writer, header, record):
+    comments = record.pop('comments', None)
+    if comments is None:
+        yield writer.writerow([record.get(name) for name in header])
+        return
+    # Колонка comments последняя: строка пишется без неё, а ячейка
+    # с массивом JSON дописывается по частям в кавычках CSV.
+    row = writer.writerow([record.get(name) for name in header[:-1]])
+    yield row[:-len(writer.dialect.lineterminator)] + ',"'
+    for piece in _json_pieces(comments):
+        yield piece.replace('"', '""')
+    yield '"' + writer.dialect.lineterminator
+
+
+def export_lines(record_types, data_format, batch_size=BATCH_SIZE):
+    """
+    Выгрузка в формате JSON Lines или CSV. Каждая строка
+     заканчивается переводом строки; строка поста с комментариями
+     приходит несколькими кусками, чтобы комментарии вирусного поста
+     не собирались в памяти целиком.
+    """
+    records = iter_all(record_types, batch_size)
+    if data_format == 'csv':
+        header = ['type']
+        for record_type in RECORD_TYPES:
+            if record_type in record_types:
+                header += [
+                    name for name in EXPORTS[record_type][1]
+                    if name not in header
+                ]
+        if POST in record_types and COMMENT in record_types:
+            header.append('comments')
+        writer = csv.writer(_Echo())
+        yield writer.writerow(header)
+        for record in records:
+            yield from _csv_record(writer, header, record)
+        return
+
+    for record in records:
+        yield from _jsonl_record(record)
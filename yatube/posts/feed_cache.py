@@ -0,0 +1,87 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.middleware.csrf import get_token
+
+GENERATION_KEY = 'posts:feed_generation'
+FOLLOW_GENERATION_KEY = 'posts:follow_generation'
+# Ленты на сайте комментарии не показывают, а списки постов в API —
+# показывают их число.
+COMMENT_GENERATION_KEY = 'posts:comment_generation'
+# Меняется при массовой загрузке в обход сигналов и входит в ETag
+# всех страниц объектов: одно обновление вместо тысяч.
+BULK_GENERATION_KEY = 'posts:bulk_generation'
+
+
+def _new_generation():
+    # Поколение начинается с метки времени: если счётчик вытеснен
+    # из кеша, новые ключи не совпадут со старыми фрагментами.
+    return int(time.time() * 1000)
+
+
+def get_generation(key=GENERATION_KEY):
+    """Текущее поколение ленты, входит в ключи кешированных фрагментов."""
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, _new_generation(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_generation(), None)
+
+
+def bump_generation(key=GENERATION_KEY):
+    """
+    Делает недействительными все закешированные фрагменты ленты —
+     после фиксации транзакции. Сброс до фиксации позволил бы
+     параллельному запросу прочитать старые данные и закешировать их
+     под новым поколением.
+    """
+    transaction.on_commit(lambda: _bump(key))
+
+
+def object_generation_key(name, pk):
+    return f'posts:{name}_generation:{pk}'
+
+
+def get_generations(keys):
+    """Поколения нескольких ключей за одно обращение к кешу."""
+    generations = cache.get_many(keys)
+    return [
+        generations[key] if key in generations else get_generation(key)
+        for key in keys
+    ]
+
+
+def bump_objects(name, *pks):
+    """Сбрасывает поколения страниц отдельных объектов."""
+    for pk in set(pks):
+        if pk is not None:
+            bump_generation(object_generation_key(name, pk))
+
+
+def make_etag(request, generations):
+    """
+    ETag страницы из поколений данных, пользователя и адреса запроса.
+     Страницы с формами содержат CSRF-токен, поэтому у вошедшего
+     пользователя в ETag входят секрет CSRF и сессия: после нового
+     входа браузер не получит 304 со старым токеном.
+    """
+    value = f'{generations}|{request.user.pk}|{request.get_full_path()}'
+    if request.user.is_authenticated:
+        # get_token заводит секрет, если его ещё нет: тот же секрет
+        # попадёт в страницу и в cookie ответа.
+        get_token(request)
+        session = getattr(request, 'session', None)
+        value += (
+            f"|{request.META['CSRF_COOKIE']}"
+            f"|{session.session_key if session else ''}"
+        )
+    return hashlib.md5(value.encode()).hexdigest()
@@ -0,0 +1,195 @@
+from array import array
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import Q
+
+from . import counters, feed_cache, recommendations, timeline
+from .models import Follow
+
+# Больше пользователей за раз — сбрасывается общее поколение страниц
+# вместо поколения каждого автора и подписчика.
+OBJECT_BUMP_LIMIT = 100
+# Сколько id удалять одним DELETE ... IN: SQLite ограничивает число
+# параметров запроса.
+BATCH_SIZE = 500
+
+
+def following_key(user_id):
+    """
+    Ключ множества подписок с поколениями подписчика. Поколение
+     читается до базы: запрос, начатый до подписки, положит старое
+     множество под старым ключом, и его уже никто не прочитает.
+    """
+    generations = feed_cache.get_generations([
+        feed_cache.BULK_GENERATION_KEY,
+        feed_cache.object_generation_key('follower', user_id),
+    ])
+    return f'posts:following:{user_id}:{generations[0]}:{generations[1]}'
+
+
+def following_ids(user):
+    """
+    id авторов, на которых подписан пользователь. В кеше множество
+     лежит отсортированным массивом 32-битных чисел и меняет ключ при
+     подписке и отписке, так что флаг подписки не ходит в базу.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    key = following_key(user.pk)
+    data = cache.get(key)
+    if data is None:
+        data = array('I', sorted(Follow.objects.filter(
+            user_id=user.pk
+        ).values_list('author_id', flat=True))).tobytes()
+        cache.set(key, data, settings.FOLLOWING_CACHE_TIMEOUT)
+    ids = array('I')
+    ids.frombytes(data)
+    return frozenset(ids)
+
+
+def _apply(follows, sign):
+    """
+    Ленты, счётчики и кеш после создания (sign=1) или удаления
+     (sign=-1) подписок.
+    """
+    if not follows:
+        return
+    if sign > 0:
+        timeline.backfill_follows(follows)
+    else:
+        timeline.clean_follows(follows)
+    for field, key in (('followers_count', 'author_id'),
+                       ('following_count', 'user_id')):
+        deltas = Counter(getattr(follow, key) for follow in follows)
+        counters.change_many_user_stats(
+            field, {pk: sign * count for pk, count in deltas.items()}
+        )
+
+    users = {follow.user_id for follow in follows}
+    recommendations.mark_stale(users)
+    feed_cache.bump_generation(feed_cache.FOLLOW_GENERATION_KEY)
+    authors = {follow.author_id for follow in follows}
+    if len(authors) + len(users) > OBJECT_BUMP_LIMIT:
+        feed_cache.bump_generation(feed_cache.BULK_GENERATION_KEY)
+    else:
+        feed_cache.bump_objects('author', *authors)
+        feed_cache.bump_objects('follower', *users)
+
+
+def followed(follows):
+    _apply(follows, 1)
+
+
+def unfollowed(follows):
+    _apply(follows, -1)
+
+
+def follow(user, author_id):
+    """
+    Подписывает пользователя на автора; повтор ничего не меняет.
+     Вставка опирается на уникальное ограничение, так что два
+     одновременных клика не создают двух подписок. Возвращает True,
+     если подписка создана этим вызовом.
+    """
+    if user.pk == author_id:
+        return False
+    try:
+        with transaction.atomic():
+            Follow.objects.create(user=user, author_id=author_id)
+    except IntegrityError:
+        return False
+    return True
+
+
+def _delete(where, params):
+    """
+    DELETE подписок без сигналов. Возвращает число удалённых строк:
+     по нему решается, менять ли ленты и счётчики. QuerySet.delete()
+     сначала читает строки, и два одновременных вызова оба отправили
+     бы post_delete за одну строку.
+    """
+    connection = connections[router.db_for_write(Follow)]
+    table = connection.ops.quote_name(Follow._meta.db_table)
+    columns = {
+        field: connection.ops.quote_name(Follow._meta.get_field(field).column)
+        for field in ('id', 'user', 'author')
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} WHERE {where.format(**columns)}', params
+        )
+        return cursor.rowcount
+
+
+def unfollow(user, author_id):
+    """
+    Отписывает одним DELETE. Ленты и счётчики меняются, только если
+     строку удалил этот вызов, поэтому повтор ничего не меняет.
+    """
+    with transaction.atomic(savepoint=False):
+        deleted = _delete(
+            '{user} = %s AND {author} = %s', [user.pk, author_id]
+        )
+        if deleted:
+            unfollowed([Follow(user_id=user.pk, author_id=author_id)])
+    return bool(deleted)
+
+
+def _batches(items, size=BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _pairs_filter(pairs):
+    authors = defaultdict(set)
+    for user_id, author_id in pairs:
+        authors[user_id].add(author_id)
+    query = Q()
+    for user_id, author_ids in authors.items():
+        query |= Q(user_id=user_id, author_id__in=author_ids)
+    return query
+
+
+def follow_many(pairs):
+    """
+    Создаёт подписки из пар (id пользователя, id автора) пачкой:
+     существующие пропускаются. Возвращает созданные подписки.
+     Пачки рассчитаны на импорт, где одни и те же пары не пишутся
+     одновременно из нескольких мест.
+    """
+    pairs = {(user_id, author_id) for user_id, author_id in pairs
+             if user_id != author_id}
+    if not pairs:
+        return []
+    with transaction.atomic():
+        existing = set(Follow.objects.filter(
+            _pairs_filter(pairs)
+        ).values_list('user_id', 'author_id'))
+        follows = [
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in pairs - existing
+        ]
+        Follow.objects.bulk_create(follows, ignore_conflicts=True)
+        followed(follows)
+    return follows
+
+
+def unfollow_many(pairs):
+    """Удаляет подписки из пар пачкой. Возвращает их число."""
+    pairs = set(pairs)
+    if not pairs:
+        return 0
+    with transaction.atomic():
+        follows = list(Follow.objects.select_for_update().filter(
+            _pairs_filter(pairs)
+        ).only('user_id', 'author_id'))
+        for batch in _batches(follows):
+            _delete(
+                '{id} IN (%s)' % ', '.join(['%s'] * len(batch)),
+                [follow.pk for follow in batch]
+            )
+        unfollowed(follows)
+    return len(follows)
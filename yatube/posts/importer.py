@@ -0,0 +1,432 @@
+import csv
+import json
+from collections import Counter
+from datetime import datetime
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connections, router, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import counters, feed_cache, follows, search, timeline
+from .models import Comment, Group, Post, SearchTerm, UserStats
+
+User = get_user_model()
+
+GROUP = 'group'
+POST = 'post'
+COMMENT = 'comment'
+FOLLOW = 'follow'
+RECORD_TYPES = (GROUP, POST, COMMENT, FOLLOW)
+
+FORMATS = ('jsonl', 'csv')
+BATCH_SIZE = 1000
+# Сколько имён пользователей и адресов групп помнить между пачками.
+LOOKUP_CACHE_SIZE = 100000
+
+
+class RecordError(ValueError):
+    """Запись нельзя импортировать; она пропускается."""
+
+
+def read_csv_records(stream):
+    reader = csv.DictReader(stream)
+    for record in reader:
+        # Пустые ячейки CSV означают отсутствие значения.
+        record = {key: value for key, value in record.items() if value}
+        if 'comments' in record:
+            # Комментарии поста лежат в ячейке массивом JSON.
+            try:
+                record['comments'] = json.loads(record['comments'])
+            except ValueError as error:
+                raise ValueError(f'Строка {reader.line_num}: {error}')
+            if not isinstance(record['comments'], list):
+                raise ValueError(
+                    f'Строка {reader.line_num}: comments — не массив'
+                )
+        yield record
+
+
+def read_records(stream, data_format):
+    """
+    Читает записи из потока по одной, не загружая файл в память.
+     Повреждённая строка JSON Lines или ячейка comments в CSV
+     прерывает импорт с ValueError.
+    """
+    if data_format == 'csv':
+        yield from read_csv_records(stream)
+        return
+
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as error:
+            raise ValueError(f'Строка {line_number}: {error}')
+        if not isinstance(record, dict):
+            raise ValueError(f'Строка {line_number}: ожидается объект')
+        yield record
+
+
+def chunks(records, size):
+    records = iter(records)
+    chunk = list(islice(records, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(records, size))
+
+
+def parse_date(value):
+    if not value:
+        return timezone.now()
+    if not isinstance(value, datetime):
+        value = parse_datetime(str(value))
+        if value is None:
+            raise RecordError('некорректная дата')
+    if settings.USE_TZ and timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+
+def nested_comments(record):
+    """Вложенные комментарии поста: массив объектов или RecordError."""
+    comments = record.get('comments') or []
+    if not isinstance(comments, list) or not all(
+        isinstance(comment, dict) for comment in comments
+    ):
+        raise RecordError('comments — не массив объектов')
+    return comments
+
+
+def required(record, field):
+    value = record.get(field)
+    if value in (None, ''):
+        raise RecordError(f'нет поля {field}')
+    return value
+
+
+def lock_for_insert(model):
+    """
+    Блокирует вставку в таблицу другими транзакциями до конца текущей,
+     чтобы новые id шли подряд после прочитанного MAX(pk).
+    """
+    connection = connections[router.db_for_write(model)]
+    if not connection.in_atomic_block:
+        raise RuntimeError('Блокировка действует только в транзакции')
+    manager = model._default_manager
+    if connection.vendor == 'sqlite':
+        # Отложенный BEGIN не берёт блокировку записи до первой записи:
+        # пустой UPDATE берёт её сразу.
+        table = connection.ops.quote_name(model._meta.db_table)
+        pk = connection.ops.quote_name(model._meta.pk.column)
+        with connection.cursor() as cursor:
+            cursor.execute(f'UPDATE {table} SET {pk} = {pk} WHERE 0')
+    else:
+        list(manager.select_for_update().order_by('-pk').values_list(
+            'pk', flat=True
+        )[:1])
+
+
+def restore_dates(model, objs, date_field, dates):
+    """
+    Возвращает даты из файла: bulk_create вызывает pre_save, и
+     auto_now_add заменяет их текущим временем. Флаги поля не трогаются —
+     поле общее для всех потоков процесса.
+    """
+    for obj, date in zip(objs, dates):
+        setattr(obj, date_field, date)
+    model._default_manager.bulk_update(
+        objs, [date_field], batch_size=BATCH_SIZE
+    )
+
+
+def insert(model, objs, date_field=None):
+    """
+    bulk_create, после которого у всех объектов есть pk. Если база
+     не возвращает id вставленных строк, они читаются обратно после
+     блокировки вставки в таблицу: новые id идут подряд. Значения
+     date_field с auto_now_add сохраняются такими, как в объектах.
+    """
+    if not objs:
+        return
+    if date_field:
+        dates = [getattr(obj, date_field) for obj in objs]
+    _insert(model, objs)
+    if date_field:
+        restore_dates(model, objs, date_field, dates)
+
+
+def _insert(model, objs):
+    manager = model._default_manager
+    connection = connections[router.db_for_write(model)]
+    if connection.features.can_return_ids_from_bulk_insert:
+        manager.bulk_create(objs)
+        return
+
+    lock_for_insert(model)
+    last_pk = manager.aggregate(last_pk=Max('pk'))['last_pk'] or 0
+    manager.bulk_create(objs)
+    pks = list(manager.filter(
+        pk__gt=last_pk
+    ).order_by('pk').values_list('pk', flat=True))
+    if len(pks) != len(objs):
+        raise RuntimeError(
+            f'Вставлено {len(objs)} строк, прочитано {len(pks)} id'
+        )
+    for obj, pk in zip(objs, pks):
+        obj.pk = pk
+
+
+class LookupCache(dict):
+    """
+    Словарь с ограниченным размером: при переполнении в нём остаются
+     только ключи, нужные текущей пачке.
+    """
+
+    def update_bounded(self, values, needed):
+        if len(self) + len(values) > LOOKUP_CACHE_SIZE:
+            kept = {key: self[key] for key in needed if key in self}
+            self.clear()
+            self.update(kept)
+        self.update(values)
+
+
+class Importer:
+    """
+    Загружает записи пачками: одна транзакция и несколько запросов
+     на пачку, а не на каждую запись. Сигналы при bulk_create
+     не срабатывают, поэтому ленты, счётчики и поисковый индекс
+     обновляются здесь же, а кеш страниц сбрасывается поколениями.
+    """
+
+    def __init__(self, default_type=None):
+        self.default_type = default_type
+        self.users = LookupCache()
+        self.groups = LookupCache()
+        self.imported = Counter()
+        self.skipped = Counter()
+
+    def record_type(self, record):
+        record_type = record.get('type') or self.default_type
+        if record_type not in RECORD_TYPES:
+            raise RecordError('неизвестный тип записи')
+        return record_type
+
+    def skip(self, error):
+        self.skip_many(error, 1)
+
+    def skip_many(self, error, count):
+        if count:
+            self.skipped[str(error)] += count
+
+    def import_chunk(self, records):
+        by_type = {record_type: [] for record_type in RECORD_TYPES}
+        for record in records:
+            try:
+                record_type = self.record_type(record)
+                if record_type == POST:
+                    # Проверяется один раз: дальше пачка читает
+                    # комментарии без проверок.
+                    record['comments'] = nested_comments(record)
+            except RecordError as error:
+                self.skip(error)
+            else:
+                by_type[record_type].append(record)
+
+        with transaction.atomic():
+            self.import_groups(by_type[GROUP])
+            self.resolve_users(by_type)
+            self.resolve_groups(by_type[POST])
+            comments = self.import_posts(by_type[POST])
+            comments += self.parse_comments(by_type[COMMENT])
+            self.import_comments(comments)
+            self.import_follows(by_type[FOLLOW])
+            feed_cache.bump_generation()
+            feed_cache.bump_generation(feed_cache.BULK_GENERATION_KEY)
+
+    def import_groups(self, records):
+        new_groups = {}
+        for record in records:
+            try:
+                slug = required(record, 'slug')
+                group = Group(
+                    slug=slug,
+                    title=required(record, 'title'),
+                    description=record.get('description', ''),
+                )
+            except RecordError as error:
+                self.skip(error)
+            else:
+                new_groups.setdefault(slug, group)
+
+        existing = set(Group.objects.filter(
+            slug__in=new_groups
+        ).values_list('slug', flat=True))
+        self.skip_many('группа уже есть', len(existing))
+        Group.objects.bulk_create(
+            group for slug, group in new_groups.items()
+            if slug not in existing
+        )
+        self.imported[GROUP] += len(new_groups) - len(existing)
+
+    def resolve_users(self, by_type):
+        """Находит id авторов пачки одним запросом, недостающих создаёт."""
+        needed = set()
+        for record in by_type[POST] + by_type[COMMENT]:
+            needed.add(record.get('author'))
+            for comment in record.get('comments', ()):
+                needed.add(comment.get('author'))
+        for record in by_type[FOLLOW]:
+            needed.update((record.get('user'), record.get('author')))
+        needed = {str(name) for name in needed if name}
+        usernames = needed - set(self.users)
+        if not usernames:
+            return
+
+        found = dict(User.objects.filter(
+            username__in=usernames
+        ).values_list('username', 'pk'))
+        new_users = [
+            User(username=name, password=make_password(None))
+            for name in usernames - set(found)
+        ]
+        insert(User, new_users)
+        UserStats.objects.bulk_create(
+            UserStats(user_id=user.pk) for user in new_users
+        )
+        self.imported['user'] += len(new_users)
+
+        found.update((user.username, user.pk) for user in new_users)
+        self.users.update_bounded(found, needed)
+
+    def resolve_groups(self, records):
+        needed = {
+            str(record['group']) for record in records if record.get('group')
+        }
+        slugs = needed - set(self.groups)
+        if slugs:
+            self.groups.update_bounded(dict(Group.objects.filter(
+                slug__in=slugs
+            ).values_list('slug', 'pk')), needed)
+
+    def user_id(self, record, field):
+        return self.users[str(required(record, field))]
+
+    def import_posts(self, records):
+        """Вставляет посты и возвращает их вложенные комментарии."""
+        posts = []
+        comments = []
+        for record in records:
+            try:
+                slug = record.get('group')
+                slug = str(slug) if slug else None
+                if slug and slug not in self.groups:
+                    raise RecordError('нет такой группы')
+                post = Post(
+                    text=required(record, 'text'),
+                    author_id=self.user_id(record, 'author'),
+                    group_id=self.groups.get(slug),
+                    pub_date=parse_date(record.get('pub_date')),
+                    # Путь к уже загруженному в хранилище файлу.
+                    image=record.get('image', ''),
+                )
+            except RecordError as error:
+                self.skip(error)
+            else:
+                posts.append(post)
+                comments.append(record['comments'])
+
+        insert(Post, posts, 'pub_date')
+        self.imported[POST] += len(posts)
+
+        timeline.fan_out_posts(posts)
+        search.index_documents(
+            SearchTerm.POST, ((post.pk, post.pk, post.text) for post in posts)
+        )
+        counters.change_many_user_stats(
+            'posts_count', Counter(post.author_id for post in posts)
+        )
+        counters.change_many_group_posts(
+            Counter(post.group_id for post in posts)
+        )
+
+        parsed = []
+        for post, records in zip(posts, comments):
+            for record in records:
+                try:
+                    parsed.append(self.comment(record, post.pk))
+                except RecordError as error:
+                    self.skip(error)
+        return parsed
+
+    def comment(self, record, post_id):
+        return Comment(
+            post_id=post_id,
+            author_id=self.user_id(record, 'author'),
+            text=required(record, 'text'),
+            created=parse_date(record.get('created')),
+        )
+
+    def parse_comments(self, records):
+        """Комментарии к уже существующим постам, по id поста."""
+        comments = []
+        for record in records:
+            try:
+                post_id = int(required(record, 'post'))
+            except (RecordError, ValueError):
+                self.skip('нет поста')
+                continue
+            try:
+                comments.append(self.comment(record, post_id))
+            except RecordError as error:
+                self.skip(error)
+
+        existing = set(Post.objects.filter(
+            pk__in={comment.post_id for comment in comments}
+        ).values_list('pk', flat=True))
+        self.skip_many('нет поста', sum(
+            comment.post_id not in existing for comment in comments
+        ))
+        return [
+            comment for comment in comments if comment.post_id in existing
+        ]
+
+    def import_comments(self, comments):
+        insert(Comment, comments, 'created')
+        self.imported[COMMENT] += len(comments)
+
+        search.index_documents(
+            SearchTerm.COMMENT,
+            (
+                (comment.pk, comment.post_id, comment.text)
+                for comment in comments
+            )
+        )
+        counters.change_many_post_comments(
+            Counter(comment.post_id for comment in comments)
+        )
+
+    def import_follows(self, records):
+        pairs = set()
+        for record in records:
+            try:
+                pair = (
+                    self.user_id(record, 'user'),
+                    self.user_id(record, 'author'),
+                )
+            except RecordError as error:
+                self.skip(error)
+                continue
+            if pair[0] == pair[1]:
+                self.skip('подписка на себя')
+            else:
+                pairs.add(pair)
+
+        created = follows.follow_many(pairs)
+        self.skip_many('подписка уже есть', len(pairs) - len(created))
+        self.imported[FOLLOW] += len(created)
@@ -0,0 +1,128 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (override_settings, setup_databases,
+                               setup_test_environment, teardown_databases,
+                               teardown_test_environment)
+from django.utils import timezone
+
+from posts.benchmark import compare, current_commit, run_views
+
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark',
+    }
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержку, число запросов и работу базы для view '
+        'приложения posts на наборах данных разного размера'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='1000,10000',
+            help='Числа постов в наборах данных через запятую'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Сколько раз вызывать каждый view'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--output',
+            help='Файл для результатов в JSON'
+        )
+        parser.add_argument(
+            '--compare',
+            help='JSON прошлого прогона для сравнения'
+        )
+
+    def parse_sizes(self, value):
+        try:
+            sizes = [int(size) for size in value.split(',')]
+        except ValueError:
+            raise CommandError('--sizes: ожидаются целые числа')
+        if not sizes or min(sizes) < 10:
+            raise CommandError('--sizes: минимум 10 постов')
+        return sizes
+
+    def seed(self, posts, seed):
+        call_command('flush', interactive=False, verbosity=0)
+        call_command(
+            'seed',
+            '--seed', str(seed),
+            '--users', str(max(posts // 10, 10)),
+            '--posts', str(posts),
+            '--comments', str(posts),
+            stdout=StringIO(),
+        )
+
+    def run_benchmarks(self, sizes, options):
+        results = []
+        for size in sizes:
+            self.stderr.write(f'Набор данных: {size} постов')
+            self.seed(size, options['seed'])
+            for row in run_views(options['repeat']):
+                results.append({'size': size, **row})
+        return results
+
+    def handle(self, *args, **options):
+        sizes = self.parse_sizes(options['sizes'])
+        if options['repeat'] < 1:
+            raise CommandError('--repeat должен быть положительным')
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare'], encoding='utf-8') as file:
+                    baseline = json.load(file)
+            except (OSError, ValueError) as error:
+                raise CommandError(error)
+
+        # Замеры идут в отдельной тестовой базе и локальном кеше,
+        # рабочие данные и общий кеш не затрагиваются.
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            with override_settings(
+                CACHES=BENCHMARK_CACHES, THUMBNAIL_WORKERS=0
+            ):
+                results = self.run_benchmarks(sizes, options)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'commit': current_commit(),
+            'created': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'repeat': options['repeat'],
+            'results': results,
+        }
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+
+        if baseline is not None:
+            for size, view, old, new, ratio, regressed in compare(
+                baseline, report
+            ):
+                line = (
+                    f'{size:>8} {view:<18} {old:>9.2f} -> {new:>9.2f} мс '
+                    f'(x{ratio:.2f})'
+                )
+                self.stderr.write(
+                    self.style.WARNING(line) if regressed else line
+                )
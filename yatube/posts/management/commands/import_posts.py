@@ -0,0 +1,93 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importer import (BATCH_SIZE, FORMATS, RECORD_TYPES, Importer,
+                            chunks, read_records)
+
+# Как часто печатать ход импорта, в секундах.
+PROGRESS_INTERVAL = 5
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает группы, посты, комментарии и подписки '
+        'из файла JSON Lines или CSV'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='Файл с записями или - для стандартного ввода'
+        )
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='Формат файла, по умолчанию — по расширению'
+        )
+        parser.add_argument(
+            '--type',
+            choices=RECORD_TYPES,
+            help='Тип записей без поля type'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Сколько записей вставлять в одной транзакции'
+        )
+
+    def open_input(self, path):
+        if path == '-':
+            return sys.stdin
+        try:
+            return open(path, encoding='utf-8', newline='')
+        except OSError as error:
+            raise CommandError(error)
+
+    def report(self, importer, processed, started):
+        elapsed = max(time.monotonic() - started, 1e-6)
+        imported = ', '.join(
+            f'{name}: {count}' for name, count in importer.imported.items()
+        ) or 'ничего'
+        return (
+            f'Обработано {processed} записей за {elapsed:.1f} с '
+            f'({processed / elapsed:.0f} в секунду); '
+            f'импортировано — {imported}'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        data_format = options['format'] or (
+            'csv' if path.lower().endswith('.csv') else 'jsonl'
+        )
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть положительным')
+
+        importer = Importer(default_type=options['type'])
+        processed = 0
+        started = last_report = time.monotonic()
+
+        stream = self.open_input(path)
+        try:
+            records = read_records(stream, data_format)
+            for chunk in chunks(records, options['batch_size']):
+                importer.import_chunk(chunk)
+                processed += len(chunk)
+                if time.monotonic() - last_report >= PROGRESS_INTERVAL:
+                    last_report = time.monotonic()
+                    self.stdout.write(
+                        self.report(importer, processed, started)
+                    )
+        except ValueError as error:
+            raise CommandError(error)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        for reason, count in importer.skipped.items():
+            self.stderr.write(f'Пропущено ({reason}): {count}')
+        self.stdout.write(self.style.SUCCESS(
+            self.report(importer, processed, started)
+        ))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from posts.recommendations import refresh
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рекомендации авторов для пользователей, чьи '
+        'подписки изменились'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='пересчитать рекомендации всех пользователей'
+        )
+        parser.add_argument(
+            '--top', type=int,
+            help='сколько рекомендаций хранить на пользователя'
+        )
+
+    def handle(self, *args, **options):
+        users = refresh(full=options['full'], top=options['top'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Рекомендации пересчитаны для {users} пользователей'
+        ))
@@ -0,0 +1,77 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importer import BATCH_SIZE, Importer, chunks
+from posts.seed import Seeder
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу большим воспроизводимым набором пользователей, '
+        'групп, постов, комментариев и подписок'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument(
+            '--comments',
+            type=int,
+            default=20000,
+            help='Примерное общее число комментариев'
+        )
+        parser.add_argument(
+            '--follows-per-user',
+            type=int,
+            default=20,
+            help='Среднее число подписок пользователя'
+        )
+        parser.add_argument(
+            '--images',
+            type=float,
+            default=0,
+            help='Доля постов с картинкой, от 0 до 1'
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='За сколько дней до сегодня распределить даты постов'
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['batch_size'] < 1:
+            raise CommandError(
+                '--users и --batch-size должны быть положительными'
+            )
+        if not 0 <= options['images'] <= 1:
+            raise CommandError('--images должен быть от 0 до 1')
+
+        seeder = Seeder(
+            seed=options['seed'],
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            follows_per_user=options['follows_per_user'],
+            image_share=options['images'],
+            days=options['days'],
+        )
+        importer = Importer()
+        started = time.monotonic()
+        for chunk in chunks(seeder.records(), options['batch_size']):
+            importer.import_chunk(chunk)
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Создано: {dict(importer.imported)}')
+
+        elapsed = time.monotonic() - started
+        created = ', '.join(
+            f'{name}: {count}' for name, count in importer.imported.items()
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано за {elapsed:.1f} с — {created}'
+        ))
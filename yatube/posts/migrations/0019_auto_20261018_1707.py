@@ -0,0 +1,62 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_timeline(apps, schema_editor):
+    """Ленты всех подписчиков одним INSERT ... SELECT в базе."""
+    quote = schema_editor.quote_name
+    follow, post, entry = (
+        apps.get_model('posts', name)._meta
+        for name in ('Follow', 'Post', 'TimelineEntry')
+    )
+
+    def column(meta, field):
+        return quote(meta.get_field(field).column)
+
+    schema_editor.execute(
+        f'INSERT INTO {quote(entry.db_table)} '
+        f'({column(entry, "user")}, {column(entry, "post")}, '
+        f'{column(entry, "pub_date")}) '
+        f'SELECT f.{column(follow, "user")}, p.{column(post, "id")}, '
+        f'p.{column(post, "pub_date")} '
+        f'FROM {quote(follow.db_table)} f '
+        f'INNER JOIN {quote(post.db_table)} p '
+        f'ON p.{column(post, "author")} = f.{column(follow, "author")}'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0018_auto_20220516_2046'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='posts.Post', verbose_name='Пост')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты подписок',
+                'verbose_name_plural': 'Записи ленты подписок',
+                'ordering': ('-pub_date',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', '-pub_date', '-id'], name='timeline_user_pub_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='posts_timelineentry_unique_post'),
+        ),
+        migrations.RunPython(fill_timeline, migrations.RunPython.noop),
+    ]
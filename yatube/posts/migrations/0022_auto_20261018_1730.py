@@ -0,0 +1,94 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:30
+
+import re
+from itertools import islice
+
+from django.db import OperationalError, migrations, models
+
+WORD_RE = re.compile(r'[^\W_]+')
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                'CREATE VIRTUAL TABLE posts_search '
+                'USING fts5(body, post_id UNINDEXED)'
+            )
+        except OperationalError:
+            # SQLite собран без FTS5: остаётся индекс в posts_searchterm.
+            pass
+        else:
+            schema_editor.execute(
+                'INSERT INTO posts_search(rowid, body, post_id) '
+                'SELECT id * 2, text, id FROM posts_post'
+            )
+            schema_editor.execute(
+                'INSERT INTO posts_search(rowid, body, post_id) '
+                'SELECT id * 2 + 1, text, post_id FROM posts_comment'
+            )
+            return
+
+    Comment = apps.get_model('posts', 'Comment')
+    Post = apps.get_model('posts', 'Post')
+    SearchTerm = apps.get_model('posts', 'SearchTerm')
+
+    def terms(kind, rows):
+        for object_id, post_id, text in rows.iterator():
+            for term in set(WORD_RE.findall(text.casefold())):
+                yield SearchTerm(
+                    term=term[:64],
+                    kind=kind,
+                    object_id=object_id,
+                    post_id=post_id
+                )
+
+    def bulk_insert(objs):
+        batch = list(islice(objs, 1000))
+        while batch:
+            SearchTerm.objects.bulk_create(batch)
+            batch = list(islice(objs, 1000))
+
+    bulk_insert(terms('post', Post.objects.values_list('id', 'id', 'text')))
+    bulk_insert(terms(
+        'comment', Comment.objects.values_list('id', 'post_id', 'text')
+    ))
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_auto_20261018_1709'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Слово')),
+                ('kind', models.CharField(choices=[('post', 'Пост'), ('comment', 'Комментарий')], max_length=8, verbose_name='Тип документа')),
+                ('object_id', models.PositiveIntegerField(verbose_name='Id документа')),
+                ('post_id', models.PositiveIntegerField(verbose_name='Id поста')),
+            ],
+            options={
+                'verbose_name': 'Слово поискового индекса',
+                'verbose_name_plural': 'Слова поискового индекса',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='searchterm',
+            index=models.Index(fields=['term', 'kind'], name='searchterm_term_kind_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='searchterm',
+            index=models.Index(fields=['kind', 'object_id'], name='searchterm_document_idx'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -21,6 +21,11 @@ class Group(models.Model):
         verbose_name='Описание',
         help_text='Укажите описание группы'
     )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество постов'
+    )
 
     class Meta:
         verbose_name = 'Группа'
@@ -60,6 +65,11 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество комментариев'
+    )
 
     def __str__(self) -> str:
         return self.text[:settings.POST_SYMBOLS_DISPLAYED]
@@ -68,6 +78,20 @@ class Post(models.Model):
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(
+                name='post_pub_date_idx',
+                fields=('-pub_date', '-id')
+            ),
+            models.Index(
+                name='post_group_pub_date_idx',
+                fields=('group', '-pub_date', '-id')
+            ),
+            models.Index(
+                name='post_author_pub_date_idx',
+                fields=('author', '-pub_date', '-id')
+            ),
+        ]
 
 
 class Comment(models.Model):
@@ -96,8 +120,15 @@ class Comment(models.Model):
     )
 
     class Meta:
+        ordering = ('created',)
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                name='comment_post_created_idx',
+                fields=('post', 'created', 'id')
+            ),
+        ]
 
 
 class Follow(models.Model):
@@ -128,3 +159,162 @@ class Follow(models.Model):
                 fields=('user', 'author')
             ),
         ]
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='stats',
+        verbose_name='Пользователь',
+    )
+
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество постов'
+    )
+
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество подписчиков'
+    )
+
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество подписок'
+    )
+
+    recommendations_stale = models.BooleanField(
+        default=True,
+        verbose_name='Рекомендации устарели'
+    )
+
+    class Meta:
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+    def __str__(self) -> str:
+        return str(self.user)
+
+
+class Recommendation(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recommendations',
+        verbose_name='Пользователь',
+    )
+
+    candidate = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Рекомендуемый автор',
+    )
+
+    rank = models.PositiveSmallIntegerField(
+        verbose_name='Место'
+    )
+
+    score = models.FloatField(
+        verbose_name='Оценка'
+    )
+
+    mutual = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Подписок пользователя среди подписчиков'
+    )
+
+    class Meta:
+        ordering = ('rank',)
+        verbose_name = 'Рекомендация'
+        verbose_name_plural = 'Рекомендации'
+        constraints = [
+            models.UniqueConstraint(
+                name='posts_recommendation_unique_rank',
+                fields=('user', 'rank')
+            ),
+        ]
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик',
+    )
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+    )
+
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации'
+    )
+
+    class Meta:
+        ordering = ('-pub_date',)
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Записи ленты подписок'
+        constraints = [
+            models.UniqueConstraint(
+                name='posts_timelineentry_unique_post',
+                fields=('user', 'post')
+            ),
+        ]
+        indexes = [
+            models.Index(
+                name='timeline_user_pub_date_idx',
+                fields=('user', '-pub_date', '-id')
+            ),
+        ]
+
+
+class SearchTerm(models.Model):
+    """
+    Обратный индекс для поиска на базах без FTS5: слово документа
+     и ссылка на пост или комментарий, в котором оно встречается.
+    """
+    POST = 'post'
+    COMMENT = 'comment'
+    KIND_CHOICES = (
+        (POST, 'Пост'),
+        (COMMENT, 'Комментарий'),
+    )
+
+    term = models.CharField(
+        max_length=64,
+        verbose_name='Слово'
+    )
+
+    kind = models.CharField(
+        max_length=8,
+        choices=KIND_CHOICES,
+        verbose_name='Тип документа'
+    )
+
+    object_id = models.PositiveIntegerField(
+        verbose_name='Id документа'
+    )
+
+    post_id = models.PositiveIntegerField(
+        verbose_name='Id поста'
+    )
+
+    class Meta:
+        verbose_name = 'Слово поискового индекса'
+        verbose_name_plural = 'Слова поискового индекса'
+        indexes = [
+            models.Index(
+                name='searchterm_term_kind_idx',
+                fields=('term', 'kind')
+            ),
+            models.Index(
+                name='searchterm_document_idx',
+                fields=('kind', 'object_id')
+            ),
+        ]
@@ -0,0 +1,191 @@
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, Q
+from django.utils.functional import cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+FORWARD = 'n'
+BACKWARD = 'p'
+# Целые значения курсора вне диапазона 64-битной колонки база
+# не примет: SQLite отвечает OverflowError вместо пустой выборки.
+MIN_INTEGER, MAX_INTEGER = -2 ** 63, 2 ** 63 - 1
+
+
+def encode_cursor(value, pk, direction):
+    """Кодирует позицию записи (значение ключа, id) в непрозрачный курсор."""
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    return urlsafe_base64_encode(f'{direction}{value}|{pk}'.encode())
+
+
+def decode_cursor(cursor):
+    """
+    Возвращает (направление, значение ключа, id) из курсора
+     или вызывает ValueError, если курсор повреждён.
+    """
+    try:
+        value = urlsafe_base64_decode(cursor).decode()
+        direction, position = value[0], value[1:]
+        value, pk = position.rsplit('|', 1)
+        pk = int(pk)
+    except (TypeError, IndexError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor')
+    if direction not in (FORWARD, BACKWARD):
+        raise ValueError('Invalid cursor')
+    return direction, value, pk
+
+
+class CursorPaginator(Paginator):
+    """
+    Пагинатор по ключу (order_field, id): выбирает страницу одним
+     запросом по индексу, без COUNT(*) и OFFSET.
+    """
+    cursor_pagination = True
+
+    def __init__(self, object_list, per_page, order_field='-pub_date'):
+        # Страницы упорядочивает get_page; порядок здесь нужен, чтобы
+        # Paginator не предупреждал о неупорядоченной выборке.
+        sign = '-' if order_field.startswith('-') else ''
+        object_list = object_list.order_by(order_field, f'{sign}pk')
+        super().__init__(object_list, per_page)
+        self.field = order_field.lstrip('-')
+        self.descending = order_field.startswith('-')
+        self.cursor = None
+        self.next_cursor = None
+        self.previous_cursor = None
+        self._num_pages = 1
+
+    @property
+    def num_pages(self):
+        # Точное число страниц неизвестно: хватает того, что Page
+        # корректно отвечает на has_next() и has_previous().
+        return self._num_pages
+
+    def decode(self, cursor):
+        direction, value, pk = decode_cursor(cursor)
+        meta = self.object_list.model._meta
+        value = self.to_python(meta.get_field(self.field), value)
+        pk = self.to_python(meta.pk, pk)
+        return direction, value, pk
+
+    @staticmethod
+    def to_python(field, value):
+        """Значение поля из курсора; недопустимое — ValueError."""
+        try:
+            value = field.to_python(value)
+        except ValidationError:
+            raise ValueError('Invalid cursor')
+        if value is None or (
+            isinstance(value, int)
+            and not MIN_INTEGER <= value <= MAX_INTEGER
+        ):
+            raise ValueError('Invalid cursor')
+        return value
+
+    def encode(self, row, direction):
+        return encode_cursor(getattr(row, self.field), row.pk, direction)
+
+    def filter_after(self, rows, value, pk, descending):
+        """Строки строго после позиции (value, pk) в заданном порядке."""
+        lookup = 'lt' if descending else 'gt'
+        return rows.filter(
+            Q(**{f'{self.field}__{lookup}': value})
+            | Q(**{self.field: value, f'pk__{lookup}': pk})
+        )
+
+    def parse_cursor(self, cursor):
+        """Позиция из курсора; повреждённый курсор ведёт в начало."""
+        if cursor:
+            try:
+                position = self.decode(cursor)
+            except ValueError:
+                pass
+            else:
+                self.cursor = cursor
+                return position
+        return FORWARD, None, None
+
+    def get_page(self, cursor):
+        direction, value, pk = self.parse_cursor(cursor)
+
+        descending = self.descending != (direction == BACKWARD)
+        sign = '-' if descending else ''
+        rows = self.object_list.order_by(f'{sign}{self.field}', f'{sign}pk')
+        if value is not None:
+            rows = self.filter_after(rows, value, pk, descending)
+
+        rows = list(rows[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if direction == BACKWARD:
+            if not has_more:
+                # Дошли до начала ленты: показываем полную первую страницу.
+                self.cursor = None
+                return self.get_page(None)
+            rows.reverse()
+            has_next, has_previous = True, True
+        else:
+            has_next, has_previous = has_more, value is not None
+
+        if rows and has_next:
+            self.next_cursor = self.encode(rows[-1], FORWARD)
+        if rows and has_previous:
+            self.previous_cursor = self.encode(rows[0], BACKWARD)
+
+        number = 2 if self.previous_cursor else 1
+        self._num_pages = number + 1 if self.next_cursor else number
+        return self._get_page(rows, number, self)
+
+
+class TimelineMixin:
+    """Отдаёт на странице посты из записей ленты подписок."""
+
+    def _get_page(self, entries, number, paginator):
+        posts = [entry.post for entry in entries]
+        return super()._get_page(posts, number, paginator)
+
+
+class TimelinePaginator(TimelineMixin, Paginator):
+    pass
+
+
+class TimelineCursorPaginator(TimelineMixin, CursorPaginator):
+    pass
+
+
+def estimate_count(queryset):
+    """
+    Примерное число строк таблицы без COUNT(*): из статистики
+     PostgreSQL или по наибольшему id (оценка сверху по индексу).
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE relname = %s',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        if row and row[0] >= 0:
+            return int(row[0])
+    return queryset.model._default_manager.using(queryset.db).aggregate(
+        max_pk=Max('pk')
+    )['max_pk'] or 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор списков админки: для всей таблицы число строк оценивается,
+     для отфильтрованной выборки считается не дальше count_limit строк.
+    """
+    count_limit = 10000
+
+    @cached_property
+    def count(self):
+        if not self.object_list.query.where:
+            estimate = estimate_count(self.object_list)
+            if estimate > self.count_limit:
+                return estimate
+        return self.object_list.order_by()[:self.count_limit].count()
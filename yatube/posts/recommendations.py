@@ -0,0 +1,150 @@
+import heapq
+import math
+from collections import Counter, defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from . import feed_cache
+from .models import Follow, Recommendation, UserStats
+
+BATCH_SIZE = 1000
+# Вес каждой подписки пользователя, которая читает кандидата, против
+# сходства с пользователями, у которых общие с ним подписки.
+MUTUAL_WEIGHT = 1.0
+# Сколько самых похожих пользователей учитывается.
+NEIGHBOURS = 50
+# Подписчики популярного автора почти ничего не говорят о сходстве,
+# а их обход самый дорогой.
+MAX_AUTHOR_FOLLOWERS = 1000
+
+
+def _batches(items):
+    items = iter(items)
+    batch = list(islice(items, BATCH_SIZE))
+    while batch:
+        yield batch
+        batch = list(islice(items, BATCH_SIZE))
+
+
+def mark_stale(user_ids):
+    """
+    Отмечает рекомендации, на которые влияют подписки этих
+     пользователей: их собственные и их подписчиков.
+    """
+    UserStats.objects.filter(
+        Q(user_id__in=user_ids) | Q(user__follower__author_id__in=user_ids)
+    ).update(recommendations_stale=True)
+
+
+def load_graph():
+    """Граф подписок в памяти: кто на кого подписан и кто кого читает."""
+    following = defaultdict(set)
+    followers = defaultdict(set)
+    for user_id, author_id in Follow.objects.values_list(
+        'user_id', 'author_id'
+    ).iterator(chunk_size=BATCH_SIZE):
+        following[user_id].add(author_id)
+        followers[author_id].add(user_id)
+    return following, followers
+
+
+def similar_users(user_id, following, followers):
+    """Пары (сходство, id) по косинусу между множествами подписок."""
+    own = following.get(user_id, ())
+    overlap = Counter()
+    for author_id in own:
+        readers = followers.get(author_id, ())
+        if len(readers) <= MAX_AUTHOR_FOLLOWERS:
+            overlap.update(readers)
+    overlap.pop(user_id, None)
+    return heapq.nlargest(NEIGHBOURS, (
+        (count / math.sqrt(len(own) * len(following[other])), other)
+        for other, count in overlap.items()
+    ))
+
+
+def recommend(user_id, following, followers, top):
+    """
+    Лучшие кандидаты для пользователя: тройки (id, оценка, сколько его
+     подписок читают кандидата). Складываются подписки подписок и
+     подписки похожих пользователей с весом сходства.
+    """
+    own = following.get(user_id, set())
+    mutual = Counter()
+    for author_id in own:
+        mutual.update(following.get(author_id, ()))
+    scores = Counter({
+        candidate: MUTUAL_WEIGHT * count
+        for candidate, count in mutual.items()
+    })
+    for similarity, other in similar_users(user_id, following, followers):
+        for candidate in following[other]:
+            scores[candidate] += similarity
+
+    excluded = own | {user_id}
+    best = heapq.nlargest(top, (
+        (score, -candidate) for candidate, score in scores.items()
+        if candidate not in excluded
+    ))
+    return [
+        (-candidate, score, mutual[-candidate]) for score, candidate in best
+    ]
+
+
+def refresh(full=False, top=None):
+    """
+    Пересчитывает рекомендации пользователей с устаревшим флагом, а с
+     full — всех. Возвращает число пересчитанных пользователей.
+    """
+    top = top or settings.RECOMMENDATIONS_TOP
+    stats = UserStats.objects.all()
+    if not full:
+        stats = stats.filter(recommendations_stale=True)
+    users = list(stats.values_list('user_id', flat=True))
+    # Флаг снимается до чтения графа: подписка во время расчёта
+    # поставит его снова, и следующий запуск её учтёт.
+    for batch in _batches(users):
+        UserStats.objects.filter(
+            user_id__in=batch
+        ).update(recommendations_stale=False)
+
+    following, followers = load_graph()
+    for batch in _batches(users):
+        rows = [
+            Recommendation(
+                user_id=user_id, candidate_id=candidate, rank=rank,
+                score=score, mutual=mutual
+            )
+            for user_id in batch
+            for rank, (candidate, score, mutual) in enumerate(
+                recommend(user_id, following, followers, top)
+            )
+        ]
+        with transaction.atomic():
+            Recommendation.objects.filter(user_id__in=batch).delete()
+            Recommendation.objects.bulk_create(rows)
+            # Рекомендации видны только в своём профиле: сбрасываются
+            # ETag профилей пересчитанных пользователей, а не всех страниц.
+            feed_cache.bump_objects('recommendations', *batch)
+    return len(users)
+
+
+def for_user(user, limit=None):
+    """
+    Рекомендации для показа одним запросом по индексу (user, rank);
+     авторы, на которых пользователь уже подписался, отбрасываются.
+    """
+    if not user.is_authenticated:
+        return []
+    followed = Follow.objects.filter(user_id=user.pk).values('author_id')
+    recommendations = Recommendation.objects.filter(
+        user_id=user.pk
+    ).exclude(
+        candidate_id__in=followed
+    ).select_related('candidate')
+    return list(
+        recommendations[:limit or settings.RECOMMENDATIONS_DISPLAYED]
+    )
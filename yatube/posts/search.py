@@ -0,0 +1,217 @@
+import re
+from itertools import islice
+
+from django.db import connection
+from django.db.models import Count
+from django.db.models.expressions import RawSQL
+
+from .models import Comment, Post, SearchTerm
+
+FTS_TABLE = 'posts_search'
+BATCH_SIZE = 1000
+MAX_QUERY_TERMS = 10
+TERM_LENGTH = SearchTerm._meta.get_field('term').max_length
+
+# Как токенизатор unicode61 в FTS5: буквы и цифры, без подчёркиваний.
+WORD_RE = re.compile(r'[^\W_]+')
+
+# rowid документа в FTS5: чётные — посты, нечётные — комментарии.
+# Так документ удаляется по первичному ключу, а не перебором таблицы.
+KIND_OFFSETS = {SearchTerm.POST: 0, SearchTerm.COMMENT: 1}
+
+_fts_tables = {}
+
+
+class _Subquery(RawSQL):
+    # Без собственных скобок: lookup __in добавляет их сам,
+    # а SQLite читает IN ((SELECT ...)) как скалярный подзапрос.
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+def tokenize(text):
+    """Слова текста в нижнем регистре, как их видит поисковый индекс."""
+    return [
+        word[:TERM_LENGTH] for word in WORD_RE.findall(text.casefold())
+    ]
+
+
+def fts_enabled():
+    """Есть ли в базе таблица FTS5; иначе используется SearchTerm."""
+    if connection.vendor != 'sqlite':
+        return False
+    name = connection.settings_dict['NAME']
+    if name not in _fts_tables:
+        _fts_tables[name] = (
+            FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_tables[name]
+
+
+def _rowid(kind, object_id):
+    return object_id * 2 + KIND_OFFSETS[kind]
+
+
+def _bulk_insert(terms):
+    terms = iter(terms)
+    batch = list(islice(terms, BATCH_SIZE))
+    while batch:
+        SearchTerm.objects.bulk_create(batch)
+        batch = list(islice(terms, BATCH_SIZE))
+
+
+def _document_terms(kind, object_id, post_id, text):
+    return (
+        SearchTerm(
+            term=term, kind=kind, object_id=object_id, post_id=post_id
+        )
+        for term in set(tokenize(text))
+    )
+
+
+def remove_documents(kind, object_ids):
+    object_ids = list(object_ids)
+    if not object_ids:
+        return
+    if fts_enabled():
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [[_rowid(kind, object_id)] for object_id in object_ids]
+            )
+    else:
+        SearchTerm.objects.filter(
+            kind=kind, object_id__in=object_ids
+        ).delete()
+
+
+def remove_document(kind, object_id):
+    remove_documents(kind, [object_id])
+
+
+def index_documents(kind, documents, new=False):
+    """
+    Заменяет документы в индексе их текущим текстом.
+     documents — кортежи (id документа, id поста, текст); для новых
+     документов (new=True) удалять из индекса нечего.
+    """
+    documents = list(documents)
+    if not documents:
+        return
+    if not new:
+        remove_documents(
+            kind, [object_id for object_id, _, _ in documents]
+        )
+    if fts_enabled():
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE}(rowid, body, post_id) '
+                'VALUES (%s, %s, %s)',
+                [
+                    [_rowid(kind, object_id), text, post_id]
+                    for object_id, post_id, text in documents
+                ]
+            )
+    else:
+        _bulk_insert(
+            term
+            for object_id, post_id, text in documents
+            for term in _document_terms(kind, object_id, post_id, text)
+        )
+
+
+def index_document(kind, object_id, post_id, text, new=False):
+    index_documents(kind, [(object_id, post_id, text)], new)
+
+
+def index_post(post, new=False):
+    index_document(SearchTerm.POST, post.pk, post.pk, post.text, new)
+
+
+def index_comment(comment, new=False):
+    index_document(
+        SearchTerm.COMMENT, comment.pk, comment.post_id, comment.text, new
+    )
+
+
+def rebuild_index():
+    """Строит поисковый индекс заново по всем постам и комментариям."""
+    if fts_enabled():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE}(rowid, body, post_id) '
+                'SELECT id * 2, text, id FROM posts_post'
+            )
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE}(rowid, body, post_id) '
+                'SELECT id * 2 + 1, text, post_id FROM posts_comment'
+            )
+        return
+
+    SearchTerm.objects.all().delete()
+    posts = Post.objects.values_list('pk', 'text')
+    _bulk_insert(
+        term
+        for post_id, text in posts.iterator(chunk_size=BATCH_SIZE)
+        for term in _document_terms(SearchTerm.POST, post_id, post_id, text)
+    )
+    comments = Comment.objects.values_list('pk', 'post_id', 'text')
+    _bulk_insert(
+        term
+        for comment_id, post_id, text in comments.iterator(
+            chunk_size=BATCH_SIZE
+        )
+        for term in _document_terms(
+            SearchTerm.COMMENT, comment_id, post_id, text
+        )
+    )
+
+
+def _query_terms(query):
+    return list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+
+
+def _matches(terms, kind, column):
+    """
+    Подзапрос с id документов, содержащих все слова запроса.
+     column — 'object_id' (сами документы) или 'post_id' (их посты).
+    """
+    if fts_enabled():
+        # Каждое слово — отдельная фраза в кавычках, поэтому
+        # синтаксис FTS5 во вводе пользователя не интерпретируется.
+        match = ' '.join(f'"{term}"' for term in terms)
+        select = 'rowid >> 1' if column == 'object_id' else 'post_id'
+        sql = f'SELECT {select} FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+        if kind is not None:
+            sql += f' AND rowid & 1 = {KIND_OFFSETS[kind]}'
+        return _Subquery(sql, [match])
+
+    documents = SearchTerm.objects.filter(term__in=terms)
+    if kind is not None:
+        documents = documents.filter(kind=kind)
+    return documents.values('kind', 'object_id', 'post_id').annotate(
+        matched_terms=Count('term')
+    ).filter(matched_terms=len(terms)).values(column)
+
+
+def search_posts(queryset, query, with_comments=True):
+    """
+    Посты, в тексте которых есть все слова запроса, а при with_comments —
+     ещё и посты, где все слова нашлись в одном из комментариев.
+    """
+    terms = _query_terms(query)
+    if not terms:
+        return queryset.none()
+    kind = None if with_comments else SearchTerm.POST
+    return queryset.filter(pk__in=_matches(terms, kind, 'post_id'))
+
+
+def search_comments(queryset, query):
+    """Комментарии, в тексте которых есть все слова запроса."""
+    terms = _query_terms(query)
+    if not terms:
+        return queryset.none()
+    return queryset.filter(
+        pk__in=_matches(terms, SearchTerm.COMMENT, 'object_id')
+    )
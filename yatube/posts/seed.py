@@ -0,0 +1,195 @@
+import io
+import random
+from bisect import bisect_left
+from datetime import timedelta
+from itertools import accumulate
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image
+
+from . import thumbnails
+from .importer import FOLLOW, GROUP, POST
+
+WORDS = (
+    'лента пост автор группа подписка комментарий новость фото город '
+    'утро вечер работа отпуск книга музыка кино футбол погода кофе '
+    'проект код релиз ошибка идея встреча друзья семья дорога море '
+    'горы лес кот собака рецепт ужин праздник выставка концерт парк'
+).split()
+
+USERNAME = 'seed_user_{}'
+GROUP_SLUG = 'seed-group-{}'
+IMAGE_NAME = 'posts/seed/seed_{}.png'
+IMAGE_VARIANTS = 8
+IMAGE_SIZE = (960, 540)
+
+
+def zipf_weights(count, exponent):
+    """
+    Накопленные веса закона Ципфа: элемент с рангом r выбирается
+     с вероятностью, пропорциональной 1 / r ** exponent.
+    """
+    return list(accumulate(
+        1 / rank ** exponent for rank in range(1, count + 1)
+    ))
+
+
+class SkewedChoice:
+    """Случайный выбор из range(count) с сильным перекосом к началу."""
+
+    def __init__(self, rng, count, exponent):
+        self.rng = rng
+        self.cum_weights = zipf_weights(count, exponent)
+        self.total = self.cum_weights[-1]
+
+    def __call__(self):
+        return bisect_left(
+            self.cum_weights, self.rng.random() * self.total
+        )
+
+
+def make_images(rng):
+    """Несколько картинок для постов и миниатюры к ним, один раз."""
+    names = []
+    for number in range(IMAGE_VARIANTS):
+        name = IMAGE_NAME.format(number)
+        if not default_storage.exists(name):
+            color = tuple(rng.randrange(256) for _ in range(3))
+            buffer = io.BytesIO()
+            Image.new('RGB', IMAGE_SIZE, color).save(buffer, 'PNG')
+            name = default_storage.save(name, ContentFile(buffer.getvalue()))
+        thumbnails.generate_thumbnails(name)
+        names.append(name)
+    return names
+
+
+class Seeder:
+    """
+    Генерирует записи для Importer. Одинаковый seed даёт одинаковые
+     данные: авторы постов и цели подписок выбираются по закону Ципфа,
+     так что у немногих пользователей большинство постов и подписчиков.
+    """
+
+    def __init__(self, seed, users, groups, posts, comments,
+                 follows_per_user, image_share=0, days=365,
+                 exponent=1.1):
+        self.rng = random.Random(seed)
+        self.users = users
+        self.groups = groups
+        self.posts = posts
+        self.comments = comments
+        self.follows_per_user = follows_per_user
+        self.image_share = image_share
+        self.exponent = exponent
+        # Даты отсчитываются от начала суток, чтобы повторный запуск
+        # в тот же день дал те же данные.
+        self.until = timezone.now().replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        self.period = timedelta(days=days).total_seconds()
+        self.images = []
+
+    def text(self, min_words, max_words):
+        words = self.rng.choices(
+            WORDS, k=self.rng.randint(min_words, max_words)
+        )
+        return ' '.join(words).capitalize()
+
+    def date(self):
+        return self.until - timedelta(
+            seconds=self.rng.random() * self.period
+        )
+
+    def date_after(self, start):
+        return start + (self.until - start) * self.rng.random()
+
+    def count(self, mean):
+        """
+        Случайное целое с экспоненциальным распределением и средним mean:
+         равномерная добавка перед округлением вниз не смещает среднее.
+        """
+        return int(self.rng.expovariate(1 / mean) + self.rng.random())
+
+    def username(self, number):
+        return USERNAME.format(number)
+
+    def group_records(self):
+        for number in range(self.groups):
+            yield {
+                'type': GROUP,
+                'slug': GROUP_SLUG.format(number),
+                'title': f'Группа {number}: {self.text(1, 3)}',
+                'description': self.text(5, 20),
+            }
+
+    def follow_records(self):
+        """
+        Каждый пользователь подписывается хотя бы на одного автора;
+         число подписчиков у авторов распределено по степенному закону.
+        """
+        target = SkewedChoice(self.rng, self.users, self.exponent)
+        for number in range(self.users):
+            count = min(
+                self.users - 1,
+                max(1, self.count(max(self.follows_per_user, 1)))
+            )
+            authors = set()
+            # Число попыток ограничено: у малых графов целей мало.
+            for _ in range(count * 4):
+                if len(authors) == count:
+                    break
+                author = target()
+                if author != number:
+                    authors.add(author)
+            for author in sorted(authors):
+                yield {
+                    'type': FOLLOW,
+                    'user': self.username(number),
+                    'author': self.username(author),
+                }
+
+    def post_records(self):
+        # Ранги авторов перемешаны относительно рангов подписок: иначе
+        # самый читаемый автор писал бы и больше всех, и размер лент
+        # рос бы как произведение двух перекосов.
+        ranks = list(range(self.users))
+        self.rng.shuffle(ranks)
+        rank = SkewedChoice(self.rng, self.users, self.exponent)
+        mean_comments = self.comments / self.posts if self.posts else 0
+        for _ in range(self.posts):
+            pub_date = self.date()
+            record = {
+                'type': POST,
+                'author': self.username(ranks[rank()]),
+                'text': self.text(5, 60),
+                'pub_date': pub_date.isoformat(),
+            }
+            if self.groups and self.rng.random() < 0.5:
+                record['group'] = GROUP_SLUG.format(
+                    self.rng.randrange(self.groups)
+                )
+            if self.images and self.rng.random() < self.image_share:
+                record['image'] = self.rng.choice(self.images)
+            if mean_comments:
+                record['comments'] = [
+                    {
+                        'author': self.username(
+                            self.rng.randrange(self.users)
+                        ),
+                        'text': self.text(2, 20),
+                        'created': self.date_after(pub_date).isoformat(),
+                    }
+                    for _ in range(self.count(mean_comments))
+                ]
+            yield record
+
+    def records(self):
+        if self.image_share:
+            self.images = make_images(self.rng)
+        yield from self.group_records()
+        # Подписки раньше постов: ленты заполняются раскладкой новых
+        # постов, а не досыпанием при каждой подписке.
+        yield from self.follow_records()
+        yield from self.post_records()
@@ -0,0 +1,167 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import counters, feed_cache, follows, search, timeline
+from .models import Comment, Follow, Group, Post, SearchTerm, UserStats
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, **kwargs):
+    instance._saved_group_id = instance._saved_author_id = None
+    if instance.pk is not None:
+        instance._saved_group_id, instance._saved_author_id = (
+            Post.objects.filter(pk=instance.pk).values_list(
+                'group_id', 'author_id'
+            ).first() or (None, None)
+        )
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        timeline.fan_out_post(instance)
+        counters.change_user_stats(instance.author_id, posts_count=1)
+        counters.change_group_posts(instance.group_id, 1)
+        return
+    if instance._saved_group_id != instance.group_id:
+        counters.change_group_posts(instance._saved_group_id, -1)
+        counters.change_group_posts(instance.group_id, 1)
+    if instance._saved_author_id != instance.author_id:
+        counters.change_user_stats(instance._saved_author_id, posts_count=-1)
+        counters.change_user_stats(instance.author_id, posts_count=1)
+        # Пост переходит из лент подписчиков прежнего автора в ленты
+        # подписчиков нового.
+        timeline.remove_post(instance)
+        timeline.fan_out_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.change_user_stats(instance.author_id, posts_count=-1)
+    counters.change_group_posts(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.change_post_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.change_post_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Post)
+def post_search_indexed(sender, instance, created, **kwargs):
+    search.index_post(instance, new=created)
+
+
+@receiver(post_delete, sender=Post)
+def post_search_removed(sender, instance, **kwargs):
+    search.remove_document(SearchTerm.POST, instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def comment_search_indexed(sender, instance, created, **kwargs):
+    search.index_comment(instance, new=created)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_search_removed(sender, instance, **kwargs):
+    search.remove_document(SearchTerm.COMMENT, instance.pk)
+
+
+# Сервис follows удаляет подписки без сигналов и сам вызывает
+# unfollowed; здесь остаются create() и удаления через ORM.
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        follows.followed([instance])
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    follows.unfollowed([instance])
+
+
+# Ленты не показывают комментарии: комментарий сбрасывает только
+# страницы своего поста (comment_pages_changed).
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def feed_changed(sender, **kwargs):
+    feed_cache.bump_generation()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_pages_changed(sender, instance, **kwargs):
+    feed_cache.bump_objects('post', instance.pk)
+    feed_cache.bump_objects(
+        'author',
+        instance.author_id,
+        getattr(instance, '_saved_author_id', None)
+    )
+    feed_cache.bump_objects(
+        'group',
+        instance.group_id,
+        getattr(instance, '_saved_group_id', None)
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_pages_changed(sender, instance, **kwargs):
+    feed_cache.bump_objects('post', instance.post_id)
+    feed_cache.bump_generation(feed_cache.COMMENT_GENERATION_KEY)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_pages_changed(sender, instance, **kwargs):
+    feed_cache.bump_objects('group', instance.pk)
+
+
+# Имя автора выводится в каждой карточке поста.
+DISPLAYED_USER_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def is_login_save(update_fields):
+    # update_last_login сохраняет пользователя при каждом входе:
+    # на страницах время входа не выводится.
+    return update_fields is not None and set(update_fields) == {'last_login'}
+
+
+@receiver(pre_save, sender=User)
+def user_saving(sender, instance, update_fields, **kwargs):
+    instance._saved_names = None
+    if instance.pk is not None and not is_login_save(update_fields):
+        instance._saved_names = User.objects.filter(
+            pk=instance.pk
+        ).values_list(*DISPLAYED_USER_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def user_pages_changed(sender, instance, created, update_fields, **kwargs):
+    if is_login_save(update_fields):
+        return
+    feed_cache.bump_objects('author', instance.pk)
+    names = tuple(getattr(instance, field) for field in DISPLAYED_USER_FIELDS)
+    if not created and instance._saved_names != names:
+        # Фрагменты ленты хранятся сутки: без сброса новое имя
+        # появилось бы на главной только после их истечения. Имя
+        # видно и на страницах групп и чужих постов, а переименования
+        # редки, поэтому сбрасываются ETag всех страниц объектов.
+        feed_cache.bump_generation()
+        feed_cache.bump_generation(feed_cache.BULK_GENERATION_KEY)
@@ -0,0 +1,102 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post
+from posts.paginators import EstimatedCountPaginator
+
+User = get_user_model()
+
+
+class AdminChangelistTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='TestAdmin', email='admin@example.com', password='pass'
+        )
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.post = Post.objects.create(text='Тестовый пост', author=cls.author)
+        cls.another_post = Post.objects.create(
+            text='Другой пост', author=cls.admin
+        )
+        cls.comment = Comment.objects.create(
+            post=cls.post, author=cls.author, text='Тестовый комментарий'
+        )
+        Comment.objects.create(
+            post=cls.another_post, author=cls.admin, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.admin, author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def test_changelists_do_not_count_whole_tables(self):
+        """
+        Списки админки открываются без COUNT(*) по всей таблице
+        """
+        for model in ('post', 'comment', 'follow'):
+            url = reverse(f'admin:posts_{model}_changelist')
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                for query in queries.captured_queries:
+                    if 'COUNT(' in query['sql']:
+                        self.assertIn('LIMIT', query['sql'])
+
+    def test_estimated_count_for_large_table(self):
+        """
+        Для всей таблицы число строк оценивается, для выборки —
+         считается до предела
+        """
+        paginator = EstimatedCountPaginator(Post.objects.all(), 10)
+        paginator.count_limit = 1
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(
+                paginator.count,
+                Post.objects.order_by('-pk').values_list('pk', flat=True)[0]
+            )
+        self.assertNotIn('COUNT(', queries.captured_queries[0]['sql'])
+
+        paginator = EstimatedCountPaginator(
+            Post.objects.filter(author=self.author), 10
+        )
+        self.assertEqual(paginator.count, 1)
+
+    def test_input_filters(self):
+        """
+        Фильтры по автору и посту принимают значение из поля ввода
+        """
+        urls_with_expected = [
+            (
+                reverse('admin:posts_post_changelist'),
+                {'author': self.author.username},
+                [self.post],
+            ),
+            (
+                reverse('admin:posts_comment_changelist'),
+                {'post': self.post.pk},
+                [self.comment],
+            ),
+            (
+                reverse('admin:posts_comment_changelist'),
+                {'post': 'abc'},
+                [],
+            ),
+            (
+                reverse('admin:posts_follow_changelist'),
+                {'user': self.author.username},
+                [],
+            ),
+        ]
+
+        for url, params, expected in urls_with_expected:
+            with self.subTest(url=url, params=params):
+                response = self.client.get(url, params)
+                self.assertEqual(
+                    list(response.context['cl'].result_list), expected
+                )
@@ -0,0 +1,67 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from posts import benchmark
+from posts.models import Comment, Post
+
+
+@override_settings(THUMBNAIL_WORKERS=0)
+class BenchmarkTests(TestCase):
+    def test_run_views(self):
+        """
+        Замер проходит по всем view, записывает запросы и работу базы
+         и не меняет размер набора данных
+        """
+        call_command(
+            'seed', '--users', '10', '--posts', '30', '--comments', '30',
+            stdout=StringIO()
+        )
+        posts, comments = Post.objects.count(), Comment.objects.count()
+
+        results = benchmark.run_views(repeat=2)
+
+        self.assertEqual(
+            {row['view'] for row in results},
+            {'index', 'group_list', 'profile', 'post_detail', 'post_comments',
+             'follow_index', 'search', 'post_create', 'add_comment',
+             'profile_follow', 'profile_unfollow'}
+        )
+        for row in results:
+            with self.subTest(view=row['view']):
+                self.assertGreater(row['queries'], 0)
+                self.assertLessEqual(row['p50_ms'], row['max_ms'])
+                if connection.vendor == 'sqlite':
+                    self.assertIsNotNone(row['db_steps'])
+        self.assertEqual(Post.objects.count(), posts)
+        self.assertEqual(Comment.objects.count(), comments)
+
+    def test_percentile(self):
+        """Перцентиль по ближайшему рангу берётся из самой выборки"""
+        values = [5, 1, 4, 2, 3]
+        self.assertEqual(benchmark.percentile(values, 50), 3)
+        self.assertEqual(benchmark.percentile(values, 90), 5)
+        self.assertEqual(benchmark.percentile(values, 0), 1)
+
+    def test_compare(self):
+        """
+        Регрессия — это рост p50 больше порога или рост числа запросов
+        """
+        def report(*rows):
+            return {'results': [
+                {'size': 100, 'view': view, 'p50_ms': p50, 'queries': queries}
+                for view, p50, queries in rows
+            ]}
+
+        rows = benchmark.compare(
+            report(('index', 10, 3), ('profile', 10, 5), ('search', 10, 3)),
+            report(('index', 10.5, 3), ('profile', 20, 5), ('search', 9, 4),
+                   ('new_view', 1, 1)),
+        )
+
+        self.assertEqual(
+            {view: regressed for _, view, *_, regressed in rows},
+            {'index': False, 'profile': True, 'search': True}
+        )
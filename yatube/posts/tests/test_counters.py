@@ -0,0 +1,139 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import (Comment, Follow, Group, Post, TimelineEntry,
+                          UserStats)
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUsername')
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.group = Group.objects.create(
+            title='Тестовая группа 1',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.another_group = Group.objects.create(
+            title='Тестовая группа 2',
+            slug='test_slug_2',
+            description='Тестовое описание 2',
+        )
+
+    def assertCounters(self, obj, **expected):
+        obj.refresh_from_db()
+        for field, value in expected.items():
+            with self.subTest(obj=obj, field=field):
+                self.assertEqual(getattr(obj, field), value)
+
+    def test_post_counters(self):
+        """
+        Счётчики постов автора и группы следуют за созданием,
+         сменой группы и удалением поста
+        """
+        post = Post.objects.create(
+            text='Тестовый пост',
+            author=self.author,
+            group=self.group
+        )
+        self.assertCounters(self.author.stats, posts_count=1)
+        self.assertCounters(self.group, posts_count=1)
+
+        post.group = self.another_group
+        post.save()
+        self.assertCounters(self.group, posts_count=0)
+        self.assertCounters(self.another_group, posts_count=1)
+
+        post.delete()
+        self.assertCounters(self.author.stats, posts_count=0)
+        self.assertCounters(self.another_group, posts_count=0)
+
+    def test_post_author_change(self):
+        """
+        Смена автора переносит пост в счётчики и ленты подписчиков
+         нового автора
+        """
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(text='Тестовый пост', author=self.author)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user, post=post).exists()
+        )
+
+        post.author = self.user
+        post.save()
+
+        self.assertCounters(self.author.stats, posts_count=0)
+        self.assertCounters(self.user.stats, posts_count=1)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+
+        post.author = self.author
+        post.save()
+
+        self.assertCounters(self.author.stats, posts_count=1)
+        self.assertCounters(self.user.stats, posts_count=0)
+        self.assertEqual(
+            list(TimelineEntry.objects.filter(post=post).values_list(
+                'user_id', flat=True
+            )),
+            [self.user.pk]
+        )
+
+    def test_comment_and_follow_counters(self):
+        """
+        Счётчики комментариев и подписок следуют за созданием
+         и удалением, в том числе каскадным
+        """
+        post = Post.objects.create(text='Тестовый пост', author=self.author)
+        Comment.objects.create(post=post, author=self.user, text='Текст')
+        Follow.objects.create(user=self.user, author=self.author)
+
+        self.assertCounters(post, comments_count=1)
+        self.assertCounters(self.author.stats, followers_count=1)
+        self.assertCounters(self.user.stats, following_count=1)
+
+        Comment.objects.all().delete()
+        self.assertCounters(post, comments_count=0)
+
+        reader = User.objects.create_user(username='TestReader')
+        Follow.objects.create(user=reader, author=self.author)
+        self.assertCounters(self.author.stats, followers_count=2)
+
+        reader.delete()
+        self.assertCounters(self.author.stats, followers_count=1)
+
+    def test_recount_counters_command(self):
+        """
+        Команда recount_counters восстанавливает счётчики по данным
+        """
+        post = Post.objects.create(
+            text='Тестовый пост',
+            author=self.author,
+            group=self.group
+        )
+        Comment.objects.create(post=post, author=self.user, text='Текст')
+        Follow.objects.create(user=self.user, author=self.author)
+
+        UserStats.objects.all().delete()
+        Group.objects.update(posts_count=0)
+        Post.objects.update(comments_count=0)
+
+        call_command('recount_counters', stdout=StringIO())
+
+        self.assertCounters(
+            UserStats.objects.get(user=self.author),
+            posts_count=1,
+            followers_count=1
+        )
+        self.assertCounters(
+            UserStats.objects.get(user=self.user),
+            following_count=1
+        )
+        self.assertCounters(self.group, posts_count=1)
+        self.assertCounters(post, comments_count=1)
@@ -0,0 +1,213 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.exporter import iter_records
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.POSTS_COUNT = 5
+
+        cls.user = User.objects.create_user(username='TestUsername')
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.admin = User.objects.create_superuser(
+            username='TestAdmin', email='admin@example.com', password='pass'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа 1',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        for post_number in range(cls.POSTS_COUNT):
+            cls.post = Post.objects.create(
+                text=f'Текст тестового поста #{post_number}',
+                author=cls.author,
+                group=cls.group,
+            )
+        cls.comment = Comment.objects.create(
+            post=cls.post,
+            author=cls.user,
+            text='Тестовый комментарий'
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
+
+    def export(self, *args):
+        stdout = StringIO()
+        call_command('export', *args, stdout=stdout, stderr=StringIO())
+        return stdout.getvalue()
+
+    def test_export_jsonl(self):
+        """
+        Выгрузка JSON Lines содержит все типы записей в формате импорта
+        """
+        records = [
+            json.loads(line) for line in self.export().splitlines()
+        ]
+
+        self.assertEqual(
+            [record['type'] for record in records],
+            ['group'] + ['post'] * self.POSTS_COUNT + ['follow']
+        )
+        self.assertEqual(records[self.POSTS_COUNT], {
+            'type': 'post',
+            'id': self.post.pk,
+            'author': self.author.username,
+            'group': self.group.slug,
+            'text': self.post.text,
+            'pub_date': self.post.pub_date.isoformat(),
+            'image': '',
+            'comments': [{
+                'author': self.user.username,
+                'text': self.comment.text,
+                'created': self.comment.created.isoformat(),
+            }],
+        })
+        self.assertEqual(
+            records[-1],
+            {'type': 'follow', 'id': self.user.follower.get().pk,
+             'user': self.user.username, 'author': self.author.username}
+        )
+
+    def test_export_csv(self):
+        """
+        CSV с выбранными типами: общий заголовок с колонкой type
+        """
+        rows = list(csv.DictReader(StringIO(
+            self.export('--format', 'csv', '--type', 'comment',
+                        '--type', 'follow')
+        )))
+
+        self.assertEqual([row['type'] for row in rows], ['comment', 'follow'])
+        self.assertEqual(rows[0]['post'], str(self.post.pk))
+        self.assertEqual(rows[1]['user'], self.user.username)
+
+    def test_export_import_round_trip(self):
+        """
+        Выгрузку можно загрузить в базу, где у постов другие id:
+         комментарии остаются у своих постов
+        """
+        for data_format in ('jsonl', 'csv'):
+            with self.subTest(data_format=data_format):
+                dump = self.export('--format', data_format)
+                with transaction.atomic():
+                    Post.objects.all().delete()
+                    # Сдвигаем id: новые посты не совпадут с выгруженными.
+                    Post.objects.create(author=self.user, text='Занимает id')
+                    path = os.path.join(
+                        self.tmp_dir, f'dump.{data_format}'
+                    )
+                    with open(path, 'w', encoding='utf-8') as file:
+                        file.write(dump)
+                    call_command(
+                        'import_posts', path, stdout=StringIO(),
+                        stderr=StringIO()
+                    )
+
+                    post = Post.objects.get(text=self.post.text)
+                    self.assertNotEqual(post.pk, self.post.pk)
+                    self.assertEqual(
+                        list(post.comments.values_list('text', flat=True)),
+                        [self.comment.text]
+                    )
+                    self.assertEqual(Comment.objects.count(), 1)
+                    transaction.set_rollback(True)
+
+    def test_export_keyset_batches(self):
+        """
+        Записи читаются пачками по ключу, без OFFSET
+        """
+        with CaptureQueriesContext(connection) as queries:
+            records = list(iter_records('post', batch_size=2))
+
+        self.assertEqual(len(records), self.POSTS_COUNT)
+        self.assertEqual(len(queries), 3)
+        for query in queries.captured_queries:
+            self.assertNotIn('OFFSET', query['sql'])
+
+    def test_export_streams_comments_of_large_post(self):
+        """
+        Комментарии поста читаются пачками по ключу не больше
+         --batch-size строк и выгружаются все, по порядку
+        """
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.user, text=f'"Ответ" {number}')
+            for number in range(4)
+        )
+        expected = list(
+            self.post.comments.order_by('created', 'pk').values_list(
+                'text', flat=True
+            )
+        )
+
+        for data_format in ('jsonl', 'csv'):
+            with self.subTest(data_format=data_format):
+                with CaptureQueriesContext(connection) as queries:
+                    dump = self.export(
+                        '--format', data_format, '--batch-size', '2'
+                    )
+                if data_format == 'csv':
+                    records = [
+                        {**row, 'comments': json.loads(row['comments'])}
+                        for row in csv.DictReader(StringIO(dump))
+                        if row['type'] == 'post'
+                    ]
+                else:
+                    records = [
+                        json.loads(line) for line in dump.splitlines()
+                        if json.loads(line)['type'] == 'post'
+                    ]
+
+                comments = next(
+                    record['comments'] for record in records
+                    if str(record['id']) == str(self.post.pk)
+                )
+                self.assertEqual(
+                    [comment['text'] for comment in comments], expected
+                )
+                comment_queries = [
+                    query['sql'] for query in queries.captured_queries
+                    if 'FROM "posts_comment"' in query['sql']
+                ]
+                self.assertGreater(len(comment_queries), 2)
+                for sql in comment_queries:
+                    self.assertIn('LIMIT 2', sql)
+
+    def test_export_view(self):
+        """
+        Потоковая выгрузка доступна только персоналу
+        """
+        url = reverse('posts:export')
+        client = Client()
+
+        client.force_login(self.user)
+        response = client.get(url)
+        self.assertEqual(response.status_code, 302)
+
+        client.force_login(self.admin)
+        response = client.get(url, {'type': 'group'})
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(json.loads(content)['slug'], self.group.slug)
+
+        response = client.get(url, {'format': 'xml'})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,164 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts import feed_cache, follows
+from posts.models import Follow, Post, TimelineEntry, UserStats
+
+from .utils import capture_on_commit_callbacks
+
+User = get_user_model()
+
+
+class FollowServiceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.other = User.objects.create_user(username='TestOther')
+        Post.objects.create(author=cls.author, text='Пост автора')
+        Post.objects.create(author=cls.other, text='Пост другого автора')
+
+    def setUp(self):
+        cache.clear()
+
+    def assertStats(self, user, **expected):
+        stats = UserStats.objects.get(user=user)
+        for field, value in expected.items():
+            with self.subTest(user=user, field=field):
+                self.assertEqual(getattr(stats, field), value)
+
+    def test_follow_is_idempotent(self):
+        """
+        Повторная подписка и отписка ничего не меняют: ни подписок,
+         ни счётчиков, ни ленты
+        """
+        self.assertTrue(follows.follow(self.user, self.author.pk))
+        self.assertFalse(follows.follow(self.user, self.author.pk))
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertStats(self.user, following_count=1)
+        self.assertStats(self.author, followers_count=1)
+        self.assertEqual(self.user.timeline.count(), 1)
+
+        self.assertTrue(follows.unfollow(self.user, self.author.pk))
+        self.assertFalse(follows.unfollow(self.user, self.author.pk))
+        self.assertFalse(Follow.objects.exists())
+        self.assertStats(self.user, following_count=0)
+        self.assertStats(self.author, followers_count=0)
+        self.assertFalse(self.user.timeline.exists())
+
+    def test_follow_self(self):
+        """На себя подписаться нельзя"""
+        self.assertFalse(follows.follow(self.user, self.user.pk))
+        self.assertFalse(Follow.objects.exists())
+
+    def test_unfollow_resets_pages(self):
+        """Отписка сбрасывает кеш ленты подписок и страниц автора"""
+        follows.follow(self.user, self.author.pk)
+        follow_generation = feed_cache.get_generation(
+            feed_cache.FOLLOW_GENERATION_KEY
+        )
+        author_key = feed_cache.object_generation_key('author', self.author.pk)
+        author_generation = feed_cache.get_generations([author_key])
+
+        with capture_on_commit_callbacks():
+            follows.unfollow(self.user, self.author.pk)
+
+        self.assertNotEqual(
+            feed_cache.get_generation(feed_cache.FOLLOW_GENERATION_KEY),
+            follow_generation
+        )
+        self.assertNotEqual(
+            feed_cache.get_generations([author_key]), author_generation
+        )
+
+    def test_bulk_follow(self):
+        """
+        Пачка пропускает существующие подписки и подписки на себя,
+         отписка пачкой удаляет только перечисленные пары
+        """
+        follows.follow(self.user, self.author.pk)
+
+        created = follows.follow_many([
+            (self.user.pk, self.author.pk),
+            (self.user.pk, self.other.pk),
+            (self.other.pk, self.author.pk),
+            (self.author.pk, self.author.pk),
+        ])
+
+        self.assertEqual(
+            {(follow.user_id, follow.author_id) for follow in created},
+            {(self.user.pk, self.other.pk), (self.other.pk, self.author.pk)}
+        )
+        self.assertEqual(Follow.objects.count(), 3)
+        self.assertStats(self.user, following_count=2)
+        self.assertStats(self.author, followers_count=2)
+        self.assertEqual(self.user.timeline.count(), 2)
+
+        self.assertEqual(follows.unfollow_many([
+            (self.user.pk, self.author.pk),
+            (self.other.pk, self.other.pk),
+        ]), 1)
+        self.assertEqual(
+            set(Follow.objects.values_list('user_id', 'author_id')),
+            {(self.user.pk, self.other.pk), (self.other.pk, self.author.pk)}
+        )
+        self.assertStats(self.user, following_count=1)
+        self.assertStats(self.author, followers_count=1)
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.user, post__author=self.author
+        ).exists())
+
+    def test_follow_missing_author(self):
+        """Подписка на несуществующего пользователя — 404"""
+        self.client.force_login(self.user)
+        for name in ('posts:profile_follow', 'posts:profile_unfollow'):
+            with self.subTest(name=name):
+                response = self.client.get(
+                    reverse(name, kwargs={'username': 'missing'})
+                )
+                self.assertEqual(response.status_code, 404)
+
+    def test_following_ids_are_cached(self):
+        """
+        Множество подписок читается из базы один раз и сбрасывается
+         при подписке и отписке
+        """
+        follows.follow(self.user, self.author.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                follows.following_ids(self.user), {self.author.pk}
+            )
+        with self.assertNumQueries(0):
+            follows.following_ids(self.user)
+
+        with capture_on_commit_callbacks():
+            follows.follow_many([(self.user.pk, self.other.pk)])
+        self.assertEqual(
+            follows.following_ids(self.user), {self.author.pk, self.other.pk}
+        )
+        with capture_on_commit_callbacks():
+            follows.unfollow(self.user, self.author.pk)
+        self.assertEqual(follows.following_ids(self.user), {self.other.pk})
+
+    def test_following_ids_ignore_late_stale_write(self):
+        """
+        Множество, прочитанное до подписки и записанное в кеш после неё,
+         не попадает к следующим запросам
+        """
+        stale_key = follows.following_key(self.user.pk)
+        with capture_on_commit_callbacks():
+            follows.follow(self.user, self.author.pk)
+        cache.set(stale_key, b'')
+
+        self.assertEqual(follows.following_ids(self.user), {self.author.pk})
+
+    def test_following_badge(self):
+        """Посты авторов из подписок отмечены в поиске"""
+        follows.follow(self.user, self.author.pk)
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('posts:search'), {'q': 'Пост'})
+
+        self.assertContains(response, 'вы подписаны', count=1)
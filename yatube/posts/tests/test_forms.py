@@ -1,12 +1,16 @@
 import shutil
+from unittest import mock
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
 from posts.models import Group, Post
+from posts.thumbnails import generate_thumbnails
 
-from .test_views import TEMP_MEDIA_ROOT, TEST_IMAGE
+from .test_views import TEMP_MEDIA_ROOT, TEST_IMAGE, TEST_IMAGE_CONTENT
 
 User = get_user_model()
 
@@ -141,3 +145,50 @@ class PostsFormTests(TestCase):
                 text=form_data['text']
             ).exists()
         )
+
+    def test_posts_form_schedules_thumbnails(self):
+        """
+        Пост с картинкой из формы ставит миниатюры в очередь генерации
+        """
+        form_data = {
+            'text': 'Текст для поста с картинкой',
+            'image': SimpleUploadedFile(
+                name='thumb.gif',
+                content=TEST_IMAGE_CONTENT,
+                content_type='image/gif'
+            ),
+        }
+
+        with mock.patch(
+            'posts.views.thumbnails.schedule_thumbnails'
+        ) as schedule_thumbnails:
+            self.authorized_client.post(
+                reverse('posts:post_create'),
+                data=form_data
+            )
+
+        post = Post.objects.get(text=form_data['text'])
+        schedule_thumbnails.assert_called_once_with(post)
+
+    def test_feed_uses_pregenerated_thumbnails(self):
+        """
+        Лента с заранее созданными миниатюрами не ресайзит картинки
+        """
+        post = Post.objects.create(
+            text='Текст для поста с картинкой',
+            author=self.user,
+            image=SimpleUploadedFile(
+                name='feed.gif',
+                content=TEST_IMAGE_CONTENT,
+                content_type='image/gif'
+            )
+        )
+        generate_thumbnails(post.image)
+        cache.clear()
+
+        with mock.patch(
+            'sorl.thumbnail.base.ThumbnailBackend._create_thumbnail'
+        ) as create_thumbnail:
+            self.authorized_client.get(reverse('posts:index'))
+
+        create_thumbnail.assert_not_called()
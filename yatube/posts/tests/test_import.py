@@ -0,0 +1,231 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from posts import importer, search, timeline
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class ImportPostsTests(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
+        self.reader = User.objects.create_user(username='TestReader')
+        self.author = User.objects.create_user(username='TestAuthor')
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def write_file(self, name, content):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def write_jsonl(self, records):
+        return self.write_file(
+            'data.jsonl',
+            '\n'.join(json.dumps(record, ensure_ascii=False)
+                      for record in records)
+        )
+
+    def import_posts(self, path, *args):
+        stdout, stderr = StringIO(), StringIO()
+        call_command('import_posts', path, *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_import_jsonl(self):
+        """
+        Импорт JSON Lines создаёт группы, пользователей, посты
+         с комментариями и подписки, сохраняя даты из файла
+        """
+        path = self.write_jsonl([
+            {'type': 'group', 'slug': 'imported', 'title': 'Импорт',
+             'description': 'Группа из файла'},
+            {'type': 'post', 'author': 'TestAuthor', 'group': 'imported',
+             'text': 'Старый пост про миграцию',
+             'pub_date': '2015-03-01T10:00:00',
+             'comments': [
+                 {'author': 'NewUser', 'text': 'Комментарий из архива'},
+             ]},
+            {'type': 'post', 'author': 'NewUser', 'text': 'Второй пост'},
+            {'type': 'follow', 'user': 'TestReader', 'author': 'NewUser'},
+            {'type': 'post', 'author': 'TestAuthor', 'group': 'missing',
+             'text': 'Пост в несуществующей группе'},
+            {'type': 'follow', 'user': 'TestReader', 'author': 'TestReader'},
+            {'type': 'unknown'},
+        ])
+
+        stdout, stderr = self.import_posts(path, '--batch-size', '2')
+
+        self.assertIn('в секунду', stdout)
+        self.assertIn('нет такой группы', stderr)
+        new_user = User.objects.get(username='NewUser')
+        self.assertFalse(new_user.has_usable_password())
+
+        post = Post.objects.get(text='Старый пост про миграцию')
+        self.assertEqual(post.group.slug, 'imported')
+        self.assertEqual(post.pub_date.year, 2015)
+        self.assertEqual(post.comments.get().author, new_user)
+
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(
+                user=self.reader
+            ).values_list('post__text', flat=True)),
+            {'Старый пост про миграцию', 'Второй пост'}
+        )
+        self.assertEqual(
+            list(search.search_posts(Post.objects.all(), 'архива')), [post]
+        )
+
+        counters = {
+            (self.author.stats, 'posts_count'): 1,
+            (new_user.stats, 'posts_count'): 1,
+            (new_user.stats, 'followers_count'): 1,
+            (self.reader.stats, 'following_count'): 2,
+            (post.group, 'posts_count'): 1,
+            (post, 'comments_count'): 1,
+        }
+        for (obj, field), expected in counters.items():
+            with self.subTest(obj=obj, field=field):
+                obj.refresh_from_db()
+                self.assertEqual(getattr(obj, field), expected)
+
+    def test_import_csv(self):
+        """
+        CSV с типом записей из параметра --type: комментарии
+         к существующим постам, пропуск записей без поста
+        """
+        post = Post.objects.create(text='Тестовый пост', author=self.author)
+        path = self.write_file(
+            'comments.csv',
+            'post,author,text,created\n'
+            f'{post.pk},TestReader,Комментарий из CSV,2020-01-01 12:00\n'
+            f'0,TestReader,Комментарий к чужому посту,\n'
+            f'{post.pk},TestReader,,\n'
+        )
+
+        stdout, stderr = self.import_posts(path, '--type', 'comment')
+
+        comment = Comment.objects.get()
+        self.assertEqual(comment.text, 'Комментарий из CSV')
+        self.assertEqual(comment.created.year, 2020)
+        self.assertIn('нет поста', stderr)
+        self.assertIn('нет поля text', stderr)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+    def test_import_queries_do_not_grow_with_rows(self):
+        """
+        Число запросов на пачку не зависит от числа записей в ней
+        """
+        query_counts = []
+        for posts_number in (5, 50):
+            path = self.write_jsonl(
+                {'type': 'post', 'author': f'Author{number % 3}',
+                 'text': f'Пост номер {number}',
+                 'comments': [{'author': 'TestReader', 'text': 'Ответ'}]}
+                for number in range(posts_number)
+            )
+            with CaptureQueriesContext(connection) as queries:
+                self.import_posts(path)
+            query_counts.append(len(queries))
+
+        self.assertEqual(Post.objects.count(), 55)
+        self.assertLessEqual(query_counts[1], query_counts[0])
+
+    def test_dates_do_not_affect_other_saves(self):
+        """
+        Даты из файла не отключают auto_now_add для постов, которые
+         сохраняются во время импорта
+        """
+        path = self.write_jsonl([
+            {'type': 'post', 'author': 'TestAuthor', 'text': 'Старый пост',
+             'pub_date': '2015-03-01T10:00:00'},
+        ])
+        fan_out_posts = timeline.fan_out_posts
+
+        def fan_out_with_concurrent_save(posts):
+            # Пост с сайта раскладывается в ленты той же функцией.
+            if not Post.objects.filter(text='Пост с сайта').exists():
+                Post.objects.create(author=self.reader, text='Пост с сайта')
+            fan_out_posts(posts)
+
+        with mock.patch.object(
+            timeline, 'fan_out_posts', fan_out_with_concurrent_save
+        ):
+            self.import_posts(path)
+
+        self.assertEqual(
+            Post.objects.get(text='Старый пост').pub_date.year, 2015
+        )
+        self.assertIsNotNone(Post.objects.get(text='Пост с сайта').pub_date)
+
+    def test_insert_checks_read_back_ids(self):
+        """
+        Id читаются обратно после блокировки вставки; чужая строка
+         среди прочитанных прерывает импорт, а не сдвигает id
+        """
+        posts = [Post(author=self.author, text=f'Пост {n}') for n in range(3)]
+        with CaptureQueriesContext(connection) as queries:
+            importer.insert(Post, posts)
+        self.assertEqual(
+            [post.pk for post in posts],
+            list(Post.objects.order_by('pk').values_list('pk', flat=True))
+        )
+        if connection.vendor == 'sqlite':
+            self.assertIn('WHERE 0', queries[0]['sql'])
+
+        bulk_create = Post.objects.bulk_create
+
+        def bulk_create_with_concurrent_insert(objs):
+            Post.objects.create(author=self.reader, text='Чужой пост')
+            bulk_create(objs)
+
+        with mock.patch.object(
+            Post.objects, 'bulk_create', bulk_create_with_concurrent_insert
+        ):
+            with self.assertRaisesMessage(RuntimeError, 'прочитано 3 id'):
+                importer.insert(Post, [
+                    Post(author=self.author, text='Новый пост')
+                    for _ in range(2)
+                ])
+
+    def test_invalid_nested_comments_are_skipped(self):
+        """
+        Пост, у которого comments не массив объектов, пропускается,
+         остальные записи импортируются
+        """
+        path = self.write_jsonl([
+            {'type': 'post', 'author': 'TestAuthor', 'text': 'Строка',
+             'comments': 'x'},
+            {'type': 'post', 'author': 'TestAuthor', 'text': 'Не объект',
+             'comments': [{'author': 'TestReader', 'text': 'Да'}, 'x']},
+            {'type': 'post', 'author': 'TestAuthor', 'text': 'Верный'},
+        ])
+
+        stdout, stderr = self.import_posts(path)
+
+        self.assertIn('comments — не массив объектов', stderr)
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)), ['Верный']
+        )
+        self.assertFalse(Comment.objects.exists())
+
+    def test_malformed_jsonl(self):
+        """
+        Повреждённая строка JSON Lines прерывает импорт с номером строки
+        """
+        path = self.write_file('broken.jsonl', '{"type": "group"\n')
+        with self.assertRaisesMessage(Exception, 'Строка 1'):
+            self.import_posts(path)
+        self.assertFalse(Group.objects.exists())
@@ -6,6 +6,7 @@ from django.test import Client, TestCase
 from django.urls import reverse
 
 from posts.models import Group, Post
+from posts.paginators import FORWARD, CursorPaginator, encode_cursor
 
 User = get_user_model()
 
@@ -74,3 +75,77 @@ class PaginatorTests(TestCase):
                 )
                 posts_on_page = len(response.context['page_obj'])
                 self.assertEqual(posts_on_page, remaining_posts_count)
+
+    def test_cursor_pagination_walks_all_posts(self):
+        """
+        Курсорная пагинация проходит ленту без пропусков и повторов
+         и возвращается назад по предыдущему курсору
+        """
+        url = reverse('posts:index')
+
+        response = self.authorized_client.get(url)
+        first_page = response.context['page_obj']
+        self.assertIsInstance(first_page.paginator, CursorPaginator)
+        self.assertFalse(first_page.has_previous())
+
+        seen_posts = list(first_page)
+        page_obj = first_page
+        while page_obj.has_next():
+            response = self.authorized_client.get(
+                url, {'cursor': page_obj.paginator.next_cursor}
+            )
+            page_obj = response.context['page_obj']
+            self.assertTrue(page_obj.has_previous())
+            seen_posts += list(page_obj)
+
+        self.assertEqual(len(seen_posts), self.POSTS_COUNT)
+        self.assertEqual(len(set(seen_posts)), self.POSTS_COUNT)
+
+        response = self.authorized_client.get(
+            url, {'cursor': page_obj.paginator.previous_cursor}
+        )
+        self.assertEqual(
+            list(response.context['page_obj']),
+            list(first_page)
+        )
+
+    def test_cursor_pagination_does_not_count_posts(self):
+        """
+        Страница по курсору загружается одним запросом без COUNT(*)
+         и с некорректным курсором открывает начало ленты
+        """
+        posts = Post.objects.select_related('author', 'group')
+
+        with self.assertNumQueries(1):
+            page_obj = CursorPaginator(
+                posts, settings.POSTS_DISPLAYED
+            ).get_page(None)
+            list(page_obj)
+
+        with self.assertNumQueries(1):
+            broken_page = CursorPaginator(
+                posts, settings.POSTS_DISPLAYED
+            ).get_page('not-a-cursor')
+
+        self.assertEqual(list(broken_page), list(page_obj))
+
+    def test_oversized_cursor_opens_first_page(self):
+        """
+        Курсор с числом вне диапазона колонки открывает начало списка,
+         а не падает при запросе к базе
+        """
+        post = self.posts[0]
+        huge = 10 ** 30
+        cursors = {
+            reverse('posts:index'): encode_cursor(
+                post.pub_date, huge, FORWARD
+            ),
+            reverse('api:post_list'): encode_cursor(
+                post.pub_date, huge, FORWARD
+            ),
+            reverse('api:group_list'): encode_cursor(huge, 1, FORWARD),
+        }
+        for url, cursor in cursors.items():
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url, {'cursor': cursor})
+                self.assertEqual(response.status_code, 200)
@@ -0,0 +1,86 @@
+import shutil
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import resolve, reverse
+
+from posts import urls
+from posts.benchmark import Scenario, measure
+from posts.models import Post
+
+from .test_views import TEMP_MEDIA_ROOT
+
+# Выгрузка читает базу пачками по мере отправки ответа: число запросов
+# растёт с объёмом данных намеренно.
+UNBUDGETED = {'export'}
+
+PAGE_VIEWS = ('index', 'group_list', 'profile', 'follow_index', 'search')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Иначе sorl-thumbnail найдёт миниатюры прошлых прогонов в кеше
+        # и не запишет их в базу.
+        cache.clear()
+        call_command(
+            'seed', '--users', '20', '--groups', '2', '--posts', '80',
+            '--comments', '160', '--follows-per-user', '5',
+            '--images', '1', stdout=StringIO()
+        )
+        # У каждого поста есть картинка: страница любого размера
+        # проходит через поиск готовых миниатюр.
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.scenario = Scenario()
+
+    def views(self):
+        edited = Post.objects.create(
+            author=self.scenario.reader, text='Пост для редактирования'
+        )
+        return self.scenario.views() + [
+            ('post_edit', 'get',
+             reverse('posts:post_edit', args=(edited.pk,)), None),
+        ]
+
+    def queries(self, method, url, data):
+        # Холодный кеш: бюджет рассчитан на худший случай.
+        cache.clear()
+        _, queries, _ = measure(self.scenario.client, method, url, data)
+        return queries
+
+    def test_every_view_declares_budget(self):
+        """Каждый view приложения объявляет бюджет запросов"""
+        for pattern in urls.urlpatterns:
+            if pattern.name in UNBUDGETED:
+                continue
+            with self.subTest(view=pattern.name):
+                self.assertTrue(hasattr(pattern.callback, 'query_budget'))
+
+    def test_views_stay_within_budget(self):
+        """View укладываются в объявленное число запросов"""
+        for name, method, url, data in self.views():
+            budget = resolve(url).func.query_budget
+            with self.subTest(view=name):
+                queries = self.queries(method, url, data)
+                self.assertLessEqual(queries, budget)
+
+    def test_queries_do_not_grow_with_page_size(self):
+        """Число запросов страницы не зависит от числа постов на ней"""
+        for name, method, url, data in self.scenario.views():
+            if name not in PAGE_VIEWS:
+                continue
+            with self.subTest(view=name):
+                with override_settings(POSTS_DISPLAYED=1):
+                    small = self.queries(method, url, data)
+                with override_settings(POSTS_DISPLAYED=20):
+                    large = self.queries(method, url, data)
+                self.assertEqual(small, large)
@@ -0,0 +1,89 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUsername')
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.group = Group.objects.create(
+            title='Тестовая группа 1',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for post_number in range(3):
+            cls.post = Post.objects.create(
+                text=f'Текст тестового поста #{post_number}',
+                author=cls.author,
+                group=cls.group,
+            )
+        Comment.objects.create(
+            post=cls.post,
+            author=cls.user,
+            text='Тестовый комментарий'
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def get_ordered_queries(self, url, table):
+        with CaptureQueriesContext(connection) as context:
+            self.authorized_client.get(url)
+        return [
+            query['sql'] for query in context.captured_queries
+            if f'FROM "{table}"' in query['sql']
+            and 'ORDER BY' in query['sql']
+        ]
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return ' '.join(str(row[-1]) for row in cursor.fetchall())
+
+    def test_feed_queries_use_indexes_instead_of_sort(self):
+        """
+        Запросы лент и комментариев читают строки по индексу
+         в нужном порядке, без сортировки во временном B-дереве
+        """
+        if connection.vendor != 'sqlite':
+            self.skipTest('План запроса проверяется только для SQLite')
+
+        urls_with_tables = [
+            (reverse('posts:index'), 'posts_post'),
+            (
+                reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+                'posts_post'
+            ),
+            (
+                reverse(
+                    'posts:profile',
+                    kwargs={'username': self.author.username}
+                ),
+                'posts_post'
+            ),
+            (reverse('posts:follow_index'), 'posts_timelineentry'),
+            (
+                reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+                'posts_comment'
+            ),
+        ]
+
+        for url, table in urls_with_tables:
+            with self.subTest(url=url):
+                queries = self.get_ordered_queries(url, table)
+                self.assertTrue(queries)
+                for sql in queries:
+                    plan = self.explain(sql)
+                    self.assertIn('INDEX', plan)
+                    self.assertNotIn('TEMP B-TREE', plan)
@@ -0,0 +1,140 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from posts import feed_cache, follows, recommendations
+from posts.models import Follow, Recommendation, UserStats
+from posts.tests.utils import capture_on_commit_callbacks
+
+User = get_user_model()
+
+
+class RecommendationsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.friend, cls.twin, cls.popular, cls.niche = (
+            User.objects.create_user(username=name)
+            for name in ('reader', 'friend', 'twin', 'popular', 'niche')
+        )
+        follows.follow_many([
+            (cls.reader.pk, cls.friend.pk),
+            (cls.friend.pk, cls.popular.pk),
+            (cls.twin.pk, cls.friend.pk),
+            (cls.twin.pk, cls.popular.pk),
+            (cls.twin.pk, cls.niche.pk),
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_recommend(self):
+        """
+        Подписки подписок стоят выше подписок похожих пользователей,
+         свои подписки и сам пользователь не рекомендуются
+        """
+        following, followers = recommendations.load_graph()
+
+        candidates = recommendations.recommend(
+            self.reader.pk, following, followers, top=10
+        )
+
+        self.assertEqual(
+            [(candidate, mutual) for candidate, _, mutual in candidates],
+            [(self.popular.pk, 1), (self.niche.pk, 0)]
+        )
+        self.assertEqual(
+            recommendations.recommend(
+                self.niche.pk, following, followers, top=10
+            ),
+            []
+        )
+
+    def test_refresh_only_stale_users(self):
+        """
+        Команда пересчитывает только пользователей, чьи подписки или
+         подписки их подписок изменились
+        """
+        out = StringIO()
+        call_command('refresh_recommendations', '--full', stdout=out)
+        self.assertIn('5', out.getvalue())
+        self.assertEqual(
+            list(self.reader.recommendations.values_list(
+                'candidate_id', 'rank'
+            )),
+            [(self.popular.pk, 0), (self.niche.pk, 1)]
+        )
+
+        follows.follow(self.friend, self.niche.pk)
+
+        self.assertEqual(
+            set(UserStats.objects.filter(
+                recommendations_stale=True
+            ).values_list('user_id', flat=True)),
+            {self.friend.pk, self.reader.pk, self.twin.pk}
+        )
+        self.assertEqual(recommendations.refresh(), 3)
+        self.assertFalse(
+            UserStats.objects.filter(recommendations_stale=True).exists()
+        )
+        self.assertEqual(
+            self.reader.recommendations.get(candidate=self.niche).mutual, 1
+        )
+
+    def test_shown_on_follow_index_and_own_profile(self):
+        """
+        Рекомендации показываются в ленте подписок и в своём профиле
+         без авторов, на которых пользователь уже подписался
+        """
+        recommendations.refresh(full=True)
+        self.client.force_login(self.reader)
+
+        for url in (
+            reverse('posts:follow_index'),
+            reverse('posts:profile', args=(self.reader.username,)),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(
+                    [rec.candidate for rec in response.context[
+                        'recommendations'
+                    ]],
+                    [self.popular, self.niche]
+                )
+
+        Follow.objects.create(user=self.reader, author=self.popular)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            [rec.candidate for rec in response.context['recommendations']],
+            [self.niche]
+        )
+        response = self.client.get(
+            reverse('posts:profile', args=(self.friend.username,))
+        )
+        self.assertEqual(response.context['recommendations'], [])
+        self.assertTrue(Recommendation.objects.filter(
+            user=self.reader, candidate=self.popular
+        ).exists())
+
+    def test_refresh_resets_only_own_profile_etag(self):
+        """
+        Пересчёт меняет ETag своего профиля пересчитанного пользователя,
+         а не поколение всех страниц
+        """
+        self.client.force_login(self.reader)
+        url = reverse('posts:profile', args=(self.reader.username,))
+        etag = self.client.get(url)['ETag']
+        bulk = feed_cache.get_generation(feed_cache.BULK_GENERATION_KEY)
+
+        with capture_on_commit_callbacks(execute=True):
+            recommendations.refresh(full=True)
+
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200
+        )
+        self.assertEqual(
+            feed_cache.get_generation(feed_cache.BULK_GENERATION_KEY), bulk
+        )
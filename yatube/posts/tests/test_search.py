@@ -0,0 +1,148 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import search
+from posts.models import Comment, Post, SearchTerm
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    """Поиск через таблицу FTS5, созданную миграцией на SQLite."""
+    fts = True
+
+    def setUp(self):
+        patcher = mock.patch.object(
+            search, 'fts_enabled', return_value=self.fts
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.author = User.objects.create_user(username='TestAuthor')
+        self.client = Client()
+        self.client.force_login(self.author)
+
+        self.post = Post.objects.create(
+            text='Ёжик в тумане зовёт: лошадка!',
+            author=self.author
+        )
+        self.another_post = Post.objects.create(
+            text='Лошадка пасётся на лугу',
+            author=self.author
+        )
+        self.comment = Comment.objects.create(
+            post=self.another_post,
+            author=self.author,
+            text='Туман над лугом'
+        )
+
+    def search_posts(self, query, **kwargs):
+        return set(search.search_posts(Post.objects.all(), query, **kwargs))
+
+    def test_search_posts_and_comments(self):
+        """
+        Находятся посты со всеми словами запроса в тексте поста
+         или в одном комментарии, без учёта регистра
+        """
+        queries_with_expected = [
+            ('ЛОШАДКА', {self.post, self.another_post}),
+            ('ёжик лошадка', {self.post}),
+            ('туман', {self.another_post}),
+            ('туман лугом', {self.another_post}),
+            ('ёжик лугу', set()),
+            ('"OR* -', set()),
+        ]
+
+        for query, expected in queries_with_expected:
+            with self.subTest(query=query):
+                self.assertEqual(self.search_posts(query), expected)
+
+        self.assertEqual(
+            self.search_posts('туман лугом', with_comments=False), set()
+        )
+        self.assertEqual(
+            list(search.search_comments(Comment.objects.all(), 'лугом')),
+            [self.comment]
+        )
+
+    def test_index_follows_changes(self):
+        """
+        Индекс обновляется при редактировании и удалении
+         постов и комментариев
+        """
+        self.post.text = 'Медвежонок считает звёзды'
+        self.post.save()
+        self.assertEqual(self.search_posts('ёжик'), set())
+        self.assertEqual(self.search_posts('звёзды'), {self.post})
+
+        self.comment.delete()
+        self.assertEqual(self.search_posts('лугом'), set())
+
+        self.another_post.delete()
+        self.assertEqual(self.search_posts('лошадка'), set())
+
+    def test_rebuild_search_index(self):
+        """
+        Команда rebuild_search_index восстанавливает индекс
+        """
+        search.remove_document(SearchTerm.POST, self.post.pk)
+        self.assertEqual(self.search_posts('ёжик'), set())
+
+        call_command('rebuild_search_index', stdout=StringIO())
+
+        self.assertEqual(self.search_posts('ёжик'), {self.post})
+        self.assertEqual(self.search_posts('туман лугом'), {self.another_post})
+
+    def test_search_page(self):
+        """
+        Страница поиска показывает найденные посты и сохраняет
+         запрос в ссылках пагинатора
+        """
+        url = reverse('posts:search')
+
+        response = self.client.get(url, {'q': 'лошадка'})
+        self.assertEqual(
+            set(response.context['page_obj']),
+            {self.post, self.another_post}
+        )
+
+        with self.settings(POSTS_DISPLAYED=1):
+            response = self.client.get(url, {'q': 'лошадка'})
+        self.assertContains(response, '?q=%D0%BB%D0%BE%D1%88%D0%B0%D0%B4')
+
+        response = self.client.get(url)
+        self.assertIsNone(response.context['page_obj'])
+
+    def test_admin_search_uses_index(self):
+        """
+        Поиск в админке идёт по индексу
+        """
+        admin = User.objects.create_superuser(
+            username='TestAdmin', email='admin@example.com', password='pass'
+        )
+        self.client.force_login(admin)
+
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'лошадка'}
+        )
+        self.assertEqual(
+            set(response.context['cl'].result_list),
+            {self.post, self.another_post}
+        )
+
+        response = self.client.get(
+            reverse('admin:posts_comment_changelist'), {'q': 'туман'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.comment]
+        )
+
+
+class PythonIndexSearchTests(SearchTests):
+    """Те же проверки для обратного индекса в SearchTerm."""
+    fts = False
@@ -0,0 +1,85 @@
+import shutil
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TestCase, override_settings
+
+from posts.counters import recount_all
+from posts.models import Comment, Follow, Group, Post, UserStats
+from posts.seed import Seeder
+
+from .test_views import TEMP_MEDIA_ROOT
+
+User = get_user_model()
+
+
+class SeedTests(TestCase):
+    def test_records_are_reproducible(self):
+        """
+        Одинаковый seed даёт одинаковые записи, разный — разные
+        """
+        def records(seed):
+            return list(Seeder(
+                seed=seed, users=50, groups=3, posts=30, comments=60,
+                follows_per_user=5
+            ).records())
+
+        self.assertEqual(records(1), records(1))
+        self.assertNotEqual(records(1), records(2))
+
+    def test_seed_command(self):
+        """
+        Команда seed создаёт данные с перекосом популярности
+         и согласованными счётчиками и лентами
+        """
+        call_command(
+            'seed', '--users', '100', '--groups', '3', '--posts', '300',
+            '--comments', '300', '--follows-per-user', '5',
+            stdout=StringIO()
+        )
+
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertGreater(Comment.objects.count(), 0)
+        self.assertEqual(
+            User.objects.filter(follower__isnull=True).count(), 0
+        )
+
+        followers = list(User.objects.annotate(
+            followers=Count('following')
+        ).order_by('-followers').values_list('followers', flat=True))
+        # Степенной закон: у первого автора подписчиков намного больше,
+        # чем у медианного.
+        self.assertGreater(followers[0], 5 * followers[len(followers) // 2])
+
+        self.assertEqual(
+            sum(UserStats.objects.values_list('posts_count', flat=True)),
+            300
+        )
+        stats = list(UserStats.objects.order_by('pk').values_list(
+            'posts_count', 'followers_count', 'following_count'
+        ))
+        recount_all()
+        self.assertEqual(stats, list(UserStats.objects.order_by(
+            'pk'
+        ).values_list('posts_count', 'followers_count', 'following_count')))
+
+        reader = Follow.objects.first().user
+        self.assertEqual(
+            reader.timeline.count(),
+            Post.objects.filter(author__following__user=reader).count()
+        )
+
+    @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+    def test_seed_images(self):
+        """
+        С параметром --images посты получают картинки
+        """
+        self.addCleanup(shutil.rmtree, TEMP_MEDIA_ROOT, ignore_errors=True)
+        call_command(
+            'seed', '--users', '5', '--posts', '5', '--comments', '0',
+            '--images', '1', stdout=StringIO()
+        )
+        self.assertFalse(Post.objects.filter(image='').exists())
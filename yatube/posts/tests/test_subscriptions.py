@@ -1,8 +1,9 @@
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.test import Client, RequestFactory, TestCase
 from django.urls import reverse
 
-from posts.models import Follow, Post
+from posts.models import Follow, Post, TimelineEntry
+from posts.views import get_page_object
 
 User = get_user_model()
 
@@ -107,3 +108,62 @@ class SubscriptionsTest(TestCase):
         following_posts = response.context.get('page_obj').object_list
 
         self.assertIn(post, following_posts)
+
+    def test_timeline_follows_subscriptions(self):
+        """
+        Лента подписок пополняется новыми постами автора, заполняется
+         старыми при подписке и очищается при отписке
+        """
+        old_post = Post.objects.create(
+            text='Пост до подписки',
+            author=self.author
+        )
+        follow = Follow.objects.create(
+            user=self.user,
+            author=self.author
+        )
+        new_post = Post.objects.create(
+            text='Пост после подписки',
+            author=self.author
+        )
+
+        self.assertQuerysetEqual(
+            self.user.timeline.order_by('pk').values_list('post', flat=True),
+            [old_post.pk, new_post.pk],
+            transform=int
+        )
+        self.assertTrue(
+            all(
+                entry.pub_date == entry.post.pub_date
+                for entry in self.user.timeline.select_related('post')
+            )
+        )
+
+        follow.delete()
+
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.user).exists()
+        )
+
+    def test_follow_index_reads_timeline_in_one_query(self):
+        """
+        Лента подписок загружается одним запросом к записям ленты
+        """
+        Follow.objects.create(
+            user=self.user,
+            author=self.author
+        )
+        for number in range(3):
+            Post.objects.create(text=f'Пост #{number}', author=self.author)
+
+        url = reverse('posts:follow_index')
+        entries = self.user.timeline.select_related(
+            'post__author', 'post__group'
+        )
+
+        with self.assertNumQueries(1):
+            posts = list(
+                get_page_object(entries, RequestFactory().get(url), True)
+            )
+
+        self.assertEqual(posts, list(Post.objects.all()))
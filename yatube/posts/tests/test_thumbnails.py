@@ -0,0 +1,83 @@
+import shutil
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from sorl.thumbnail import get_thumbnail
+
+from posts.models import Post
+from posts.thumbnails import (FEED_THUMBNAIL, generate_thumbnails,
+                              prefetch_thumbnail_urls)
+
+from .test_views import TEMP_MEDIA_ROOT, TEST_IMAGE_CONTENT
+
+User = get_user_model()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUsername')
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост с картинкой #{post_number}',
+                author=cls.user,
+                image=SimpleUploadedFile(
+                    name=f'feed_{post_number}.gif',
+                    content=TEST_IMAGE_CONTENT,
+                    content_type='image/gif'
+                )
+            ) for post_number in range(3)
+        ]
+        cls.post_without_image = Post.objects.create(
+            text='Пост без картинки',
+            author=cls.user,
+        )
+        for post in cls.posts:
+            generate_thumbnails(post.image)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_prefetch_thumbnail_urls_in_one_query(self):
+        """
+        Адреса миниатюр всей страницы находятся одним запросом
+        """
+        posts = list(Post.objects.all())
+        geometry, options = FEED_THUMBNAIL
+
+        with self.assertNumQueries(1):
+            prefetch_thumbnail_urls(posts)
+
+        for post in posts:
+            with self.subTest(post=post):
+                expected_url = (
+                    get_thumbnail(post.image, geometry, **options).url
+                    if post.image else None
+                )
+                self.assertEqual(post.thumb_url, expected_url)
+
+        with self.assertNumQueries(0):
+            prefetch_thumbnail_urls(posts)
+
+    def test_feed_renders_prefetched_thumbnails(self):
+        """
+        Лента выводит адреса миниатюр, найденные заранее
+        """
+        response = Client().get(reverse('posts:index'))
+
+        for post in response.context['page_obj']:
+            with self.subTest(post=post):
+                if post.image:
+                    self.assertContains(response, post.thumb_url)
+                else:
+                    self.assertIsNone(post.thumb_url)
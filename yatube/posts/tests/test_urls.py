@@ -55,6 +55,11 @@ class PostsUrlTests(TestCase):
                 kwargs={'post_id': self.post.pk}
             ), f'/posts/{self.post.pk}/'),
 
+            (reverse(
+                'posts:post_comments',
+                kwargs={'post_id': self.post.pk}
+            ), f'/posts/{self.post.pk}/comments/'),
+
             (reverse('posts:post_create'), '/create/'),
 
             (reverse(
@@ -1,29 +1,40 @@
+import os
 import shutil
+import subprocess
+import sys
 import tempfile
+from http import HTTPStatus
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import update_last_login
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from posts import feed_cache
 from posts.forms import PostForm
 from posts.models import Comment, Group, Post
 
+from .utils import capture_on_commit_callbacks
+
 User = get_user_model()
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEST_IMAGE_CONTENT = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
 TEST_IMAGE = SimpleUploadedFile(
     name='small.gif',
-    content=(
-        b'\x47\x49\x46\x38\x39\x61\x02\x00'
-        b'\x01\x00\x80\x00\x00\x00\x00\x00'
-        b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
-        b'\x00\x00\x00\x2C\x00\x00\x00\x00'
-        b'\x02\x00\x01\x00\x00\x02\x02\x0C'
-        b'\x0A\x00\x3B'
-    ),
+    content=TEST_IMAGE_CONTENT,
     content_type='image/gif'
 )
 
@@ -232,13 +243,22 @@ class PostsViewTests(TestCase):
         )
 
         response_1 = self.authorized_client.get(url)
-        another_post.delete()
-        response_2 = self.authorized_client.get(url)
+        Post.objects.filter(pk=another_post.pk).update(
+            text='Изменение в обход сигналов'
+        )
+        with CaptureQueriesContext(connection) as context:
+            response_2 = self.authorized_client.get(url)
 
         self.assertEqual(
             response_1.content,
             response_2.content
         )
+        self.assertFalse(
+            any(
+                'posts_post' in query['sql']
+                for query in context.captured_queries
+            )
+        )
 
         cache.clear()
         response_3 = self.authorized_client.get(url)
@@ -247,3 +267,374 @@ class PostsViewTests(TestCase):
             response_1.content,
             response_3.content
         )
+
+    def test_index_page_cache_invalidated_on_changes(self):
+        """
+        Изменения постов и групп сбрасывают кеш главной страницы,
+         новый комментарий — только страницы своего поста
+        """
+        url = reverse('posts:index')
+
+        with capture_on_commit_callbacks():
+            another_post = Post.objects.create(
+                text='Пост для проверки кэширования',
+                author=self.user
+            )
+        response_1 = self.authorized_client.get(url)
+
+        with capture_on_commit_callbacks():
+            another_post.delete()
+        response_2 = self.authorized_client.get(url)
+
+        self.assertNotEqual(
+            response_1.content,
+            response_2.content
+        )
+
+        generation = feed_cache.get_generation()
+        with capture_on_commit_callbacks():
+            self.another_group.save()
+        self.assertNotEqual(generation, feed_cache.get_generation())
+
+        generation = feed_cache.get_generation()
+        post_key = feed_cache.object_generation_key('post', self.post.pk)
+        post_generation = feed_cache.get_generation(post_key)
+        with capture_on_commit_callbacks():
+            Comment.objects.create(
+                post=self.post,
+                author=self.user,
+                text='Новый комментарий'
+            )
+        self.assertEqual(generation, feed_cache.get_generation())
+        self.assertNotEqual(
+            post_generation, feed_cache.get_generation(post_key)
+        )
+
+    def test_index_page_cache_invalidated_on_rename(self):
+        """
+        Новое имя автора сразу видно на главной странице
+        """
+        url = reverse('posts:index')
+        self.authorized_client.get(url)
+
+        author = User.objects.get(pk=self.user.pk)
+        with capture_on_commit_callbacks():
+            author.first_name = 'Переименованный'
+            author.save()
+
+        self.assertContains(self.authorized_client.get(url), 'Переименованный')
+
+    def test_generation_bumped_after_commit(self):
+        """
+        Поколение ленты меняется только после фиксации транзакции:
+         до неё параллельный запрос видит старые данные
+        """
+        generation = feed_cache.get_generation()
+        with capture_on_commit_callbacks(execute=False) as callbacks:
+            Post.objects.create(text='Пост в транзакции', author=self.user)
+            self.assertEqual(generation, feed_cache.get_generation())
+
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(generation, feed_cache.get_generation())
+
+
+@override_settings(COMMENTS_DISPLAYED=3)
+class PostCommentsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='TestUsername')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'Комментарий {number}'
+            )
+            for number in range(7)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_detail_shows_first_comments(self):
+        """
+        Страница поста показывает первые комментарии по дате
+         и ссылку на следующие
+        """
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,))
+        )
+
+        page = response.context['comments_page']
+        self.assertEqual(list(page), self.comments[:3])
+        self.assertContains(
+            response,
+            reverse('posts:post_comments', args=(self.post.pk,))
+            + f'?cursor={page.paginator.next_cursor}'
+        )
+
+    def test_load_more(self):
+        """
+        Следующие страницы приходят фрагментом HTML или JSON,
+         на последней нет ссылки дальше
+        """
+        url = reverse('posts:post_comments', args=(self.post.pk,))
+        texts = []
+        cursor = ''
+        while cursor is not None:
+            response = self.client.get(
+                url, {'cursor': cursor, 'format': 'json'}
+            )
+            data = response.json()
+            texts += [comment['text'] for comment in data['comments']]
+            cursor = data['next_cursor']
+        self.assertEqual(
+            texts, [comment.text for comment in self.comments]
+        )
+
+        response = self.client.get(url)
+        self.assertTemplateUsed(response, 'posts/includes/comments.html')
+        self.assertContains(response, 'Комментарий 2')
+        self.assertNotContains(response, 'Комментарий 3')
+
+        response = self.client.get(
+            reverse('posts:post_comments', args=(0,))
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_post_detail_queries_do_not_grow_with_comments(self):
+        """
+        Число и объём запросов страницы поста не зависят
+         от числа комментариев
+        """
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(url)
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.user, text='Ещё')
+            for _ in range(50)
+        )
+        cache.clear()
+        with CaptureQueriesContext(connection) as after:
+            response = self.client.get(url)
+
+        self.assertEqual(len(after), len(before))
+        self.assertEqual(len(response.context['comments_page']), 3)
+
+    def test_add_comment_fragment(self):
+        """
+        Комментарий из скрипта возвращает только свою разметку,
+         ошибки формы — в JSON, несуществующий пост — 404
+        """
+        self.client.force_login(self.user)
+        url = reverse('posts:add_comment', args=(self.post.pk,))
+        headers = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                url, {'text': 'Комментарий без перезагрузки'}, **headers
+            )
+
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        self.assertTemplateUsed(response, 'posts/includes/comment.html')
+        self.assertTemplateNotUsed(response, 'posts/post_detail.html')
+        self.assertContains(
+            response, 'Комментарий без перезагрузки', status_code=201
+        )
+        self.assertFalse(any(
+            'SELECT "posts_post"."text"' in query['sql']
+            for query in queries.captured_queries
+        ))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 8)
+
+        response = self.client.post(url, {'text': ''}, **headers)
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn('text', response.json()['errors'])
+
+        response = self.client.post(
+            reverse('posts:add_comment', args=(0,)), {'text': 'Текст'},
+            **headers
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        self.assertEqual(Comment.objects.count(), 8)
+
+
+class SharedCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUsername')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Пост для проверки общего кеша',
+        )
+
+    def other_process(self, code):
+        """Выполняет код в отдельном процессе manage.py с тем же кешем."""
+        environ = {
+            **os.environ,
+            'YATUBE_CACHE': 'file',
+            'YATUBE_CACHE_DIR': settings.CACHE_DIR,
+        }
+        result = subprocess.run(
+            [sys.executable, 'manage.py', 'shell', '-c', code],
+            cwd=settings.BASE_DIR, env=environ, capture_output=True,
+            text=True, timeout=60, check=True
+        )
+        return result.stdout.strip()
+
+    @override_settings(CACHES={'default': {
+        **settings.CACHE_BACKENDS['file'], 'KEY_PREFIX': 'yatube',
+    }})
+    def test_index_page_cache_shared_between_processes(self):
+        """
+        Поколение ленты в файловом кеше видно другому процессу,
+         и сброс в другом процессе виден этому
+        """
+        cache.clear()
+        self.client.get(reverse('posts:index'))
+        generation = feed_cache.get_generation()
+
+        self.assertEqual(self.other_process(
+            'from posts import feed_cache; '
+            'print(feed_cache.get_generation())'
+        ), str(generation))
+
+        # Напрямую через кеш: bump_generation ждёт фиксации транзакции
+        # и открыл бы базу разработки в другом процессе.
+        self.other_process(
+            'from django.core.cache import cache; '
+            'from posts import feed_cache; '
+            'cache.incr(feed_cache.GENERATION_KEY)'
+        )
+        self.assertNotEqual(feed_cache.get_generation(), generation)
+        cache.clear()
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUsername')
+        cls.group = Group.objects.create(
+            title='Тестовая группа 1',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Пост для проверки условных запросов',
+            group=cls.group,
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def test_pages_return_not_modified(self):
+        """
+        Страницы поста, профиля и группы отвечают 304, пока их данные
+         не изменились, и полной страницей после изменения
+        """
+        urls_with_changes = [
+            (
+                reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+                lambda: Comment.objects.create(
+                    post=self.post, author=self.user, text='Комментарий'
+                ),
+            ),
+            (
+                reverse(
+                    'posts:profile',
+                    kwargs={'username': self.user.username}
+                ),
+                lambda: Post.objects.create(author=self.user, text='Пост'),
+            ),
+            (
+                reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+                lambda: self.post.save(),
+            ),
+        ]
+
+        for url, change in urls_with_changes:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                etag = response['ETag']
+
+                response = self.authorized_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED
+                )
+
+                with capture_on_commit_callbacks():
+                    change()
+                response = self.authorized_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_group_etag_follows_author_rename(self):
+        """
+        После переименования автора страница группы приходит целиком,
+         а вход пользователя ETag его профиля не меняет
+        """
+        group_url = reverse(
+            'posts:group_list', kwargs={'slug': self.group.slug}
+        )
+        profile_url = reverse(
+            'posts:profile', kwargs={'username': self.user.username}
+        )
+        group_etag = self.authorized_client.get(group_url)['ETag']
+        profile_etag = self.authorized_client.get(profile_url)['ETag']
+
+        author = User.objects.get(pk=self.user.pk)
+        with capture_on_commit_callbacks():
+            update_last_login(None, author)
+        self.assertEqual(
+            self.authorized_client.get(
+                profile_url, HTTP_IF_NONE_MATCH=profile_etag
+            ).status_code,
+            HTTPStatus.NOT_MODIFIED
+        )
+
+        with capture_on_commit_callbacks():
+            author.last_name = 'Переименованный'
+            author.save()
+        response = self.authorized_client.get(
+            group_url, HTTP_IF_NONE_MATCH=group_etag
+        )
+        self.assertContains(response, 'Переименованный')
+
+    def test_etag_depends_on_user(self):
+        """
+        Разные пользователи получают разные ETag одной страницы
+        """
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+
+        etag = self.authorized_client.get(url)['ETag']
+        response = Client().get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_etag_changes_after_login(self):
+        """
+        После выхода и нового входа страница с формой приходит целиком:
+         в закешированной браузером копии устаревший CSRF-токен
+        """
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        etag = client.get(url)['ETag']
+        self.assertEqual(
+            client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+            HTTPStatus.NOT_MODIFIED
+        )
+
+        client.logout()
+        client.force_login(self.user)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
@@ -0,0 +1,28 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+@contextmanager
+def capture_on_commit_callbacks(using=DEFAULT_DB_ALIAS, execute=True):
+    """
+    Колбэки transaction.on_commit, добавленные внутри блока: TestCase
+     не фиксирует транзакцию, и сами они не выполнятся. Как
+     TestCase.captureOnCommitCallbacks из Django 3.2.
+    """
+    connection = connections[using]
+    start = len(connection.run_on_commit)
+    callbacks = []
+    try:
+        yield callbacks
+    finally:
+        while True:
+            added = connection.run_on_commit[start:]
+            del connection.run_on_commit[start:]
+            if not added:
+                break
+            callbacks.extend(func for _, func in added)
+            if not execute:
+                break
+            for _, func in added:
+                func()
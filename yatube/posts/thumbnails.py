@@ -0,0 +1,130 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore as CachedDBStore
+from sorl.thumbnail.models import KVStore
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Размеры должны совпадать с тегами {% thumbnail %} в шаблонах
+# includes/post.html и posts/post_detail.html.
+POST_THUMBNAILS = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+FEED_THUMBNAIL = POST_THUMBNAILS[0]
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails'
+        )
+    return _executor
+
+
+def generate_thumbnails(image):
+    """Создаёт все миниатюры картинки, которые используют шаблоны."""
+    for geometry, options in POST_THUMBNAILS:
+        get_thumbnail(image, geometry, **options)
+
+
+def _generate_post_thumbnails(post_id):
+    try:
+        post = Post.objects.only('image').get(pk=post_id)
+        if post.image:
+            generate_thumbnails(post.image)
+    except Exception:
+        logger.exception('Thumbnail generation failed for post %s', post_id)
+    finally:
+        connection.close()
+
+
+def schedule_thumbnails(post):
+    """
+    После фиксации транзакции отправляет создание миниатюр поста
+     в фоновый пул, чтобы ленты не тратили время на ресайз.
+    """
+    if not post.image:
+        return
+    if not settings.THUMBNAIL_WORKERS:
+        transaction.on_commit(lambda: generate_thumbnails(post.image))
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(_generate_post_thumbnails, post.pk)
+    )
+
+
+def _thumbnail_name(image, geometry, options):
+    # Повторяет подготовку опций из ThumbnailBackend.get_thumbnail,
+    # чтобы имя миниатюры совпало с тем, что создаёт sorl-thumbnail.
+    backend = default.backend
+    source = ImageFile(image)
+    options = dict(options)
+    if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(thumbnail_settings, attr)
+        if value != getattr(default_settings, attr):
+            options.setdefault(key, value)
+    return backend._get_thumbnail_filename(source, geometry, options)
+
+
+def _get_many_raw(keys):
+    kvstore = default.kvstore
+    if not isinstance(kvstore, CachedDBStore):
+        return {key: kvstore._get_raw(key) for key in keys}
+
+    values = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        stored = dict(
+            KVStore.objects.filter(
+                key__in=missing
+            ).values_list('key', 'value')
+        )
+        kvstore.cache.set_many(
+            stored, thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT
+        )
+        values.update(stored)
+    return values
+
+
+def prefetch_thumbnail_urls(posts):
+    """
+    Одним обращением к хранилищу sorl-thumbnail находит готовые
+     миниатюры ленты и сохраняет их адреса в post.thumb_url.
+    """
+    geometry, options = FEED_THUMBNAIL
+    post_keys = []
+    for post in posts:
+        post.thumb_url = None
+        if post.image:
+            thumbnail = ImageFile(
+                _thumbnail_name(post.image, geometry, options),
+                default.storage
+            )
+            post_keys.append((post, add_prefix(thumbnail.key)))
+
+    if not post_keys:
+        return
+    values = _get_many_raw(list({key for _, key in post_keys}))
+    for post, key in post_keys:
+        value = values.get(key)
+        if value and value is not EMPTY_VALUE:
+            post.thumb_url = deserialize_image_file(value).url
@@ -0,0 +1,80 @@
+from collections import defaultdict
+from itertools import islice
+
+from django.db.models import Q
+
+from .models import Follow, Post, TimelineEntry
+
+BATCH_SIZE = 1000
+
+
+def _bulk_insert(entries):
+    entries = iter(entries)
+    batch = list(islice(entries, BATCH_SIZE))
+    while batch:
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        batch = list(islice(entries, BATCH_SIZE))
+
+
+def fan_out_posts(posts):
+    """Раскладывает новые посты в ленты подписчиков их авторов."""
+    posts = list(posts)
+    followers = defaultdict(list)
+    for author_id, user_id in Follow.objects.filter(
+        author_id__in={post.author_id for post in posts}
+    ).values_list('author_id', 'user_id').iterator(chunk_size=BATCH_SIZE):
+        followers[author_id].append(user_id)
+
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        for post in posts
+        for user_id in followers[post.author_id]
+    )
+
+
+def fan_out_post(post):
+    fan_out_posts([post])
+
+
+def remove_post(post):
+    """Убирает пост из всех лент, например перед сменой автора."""
+    TimelineEntry.objects.filter(post=post).delete()
+
+
+def backfill_follows(follows):
+    """Добавляет в ленты подписчиков уже опубликованные посты авторов."""
+    followers = defaultdict(list)
+    for follow in follows:
+        followers[follow.author_id].append(follow.user_id)
+
+    posts = Post.objects.filter(
+        author_id__in=followers
+    ).values_list('author_id', 'pk', 'pub_date')
+
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for author_id, post_id, pub_date in posts.iterator(
+            chunk_size=BATCH_SIZE
+        )
+        for user_id in followers[author_id]
+    )
+
+
+def backfill_follow(follow):
+    backfill_follows([follow])
+
+
+def clean_follows(follows):
+    """Убирает посты авторов из лент отписавшихся пользователей."""
+    authors = defaultdict(set)
+    for follow in follows:
+        authors[follow.user_id].add(follow.author_id)
+
+    query = Q()
+    for user_id, author_ids in authors.items():
+        query |= Q(user_id=user_id, post__author_id__in=author_ids)
+    TimelineEntry.objects.filter(query).delete()
+
+
+def clean_follow(follow):
+    clean_follows([follow])
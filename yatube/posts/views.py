@@ -1,92 +1,266 @@
 from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
-from django.db.models import Prefetch
+from django.db import transaction
+from django.http import (Http404, HttpResponseBadRequest, JsonResponse,
+                         StreamingHttpResponse)
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.functional import SimpleLazyObject, empty
+from django.utils.http import urlencode
+from django.views.decorators.http import condition
 
+from core import metrics
+
+from . import (exporter, feed_cache, follows, recommendations, search,
+               thumbnails)
 from .forms import CommentForm, PostForm
-from .models import Comment, Follow, Group, Post
+from .importer import FORMATS, RECORD_TYPES
+from .models import Group, Post
+from .paginators import (CursorPaginator, TimelineCursorPaginator,
+                         TimelinePaginator)
 
 User = get_user_model()
 
+EXPORT_CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def query_budget(queries):
+    """
+    Объявляет, сколько запросов к базе может сделать view, включая
+     сессию и пользователя. Тесты проверяют бюджет на засеянных данных.
+    """
+    def decorator(view):
+        view.query_budget = queries
+        return view
+    return decorator
+
+
+def get_page_object(posts, request, timeline=False):
+    page_number = request.GET.get('page')
+    if page_number is not None:
+        paginator_class = TimelinePaginator if timeline else Paginator
+        paginator = paginator_class(posts, settings.POSTS_DISPLAYED)
+        page_obj = paginator.get_page(page_number)
+    else:
+        paginator_class = (
+            TimelineCursorPaginator if timeline else CursorPaginator
+        )
+        paginator = paginator_class(posts, settings.POSTS_DISPLAYED)
+        page_obj = paginator.get_page(request.GET.get('cursor'))
+
+    thumbnails.prefetch_thumbnail_urls(page_obj)
+    return page_obj
+
+
+def is_fragment_request(request):
+    return request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+
+
+def get_comments_page(post, cursor):
+    # Комментарии выбираются страницами по индексу (post, created, id),
+    # поэтому стоимость страницы не зависит от их общего числа.
+    paginator = CursorPaginator(
+        post.comments.select_related('author'),
+        settings.COMMENTS_DISPLAYED,
+        'created'
+    )
+    return paginator.get_page(cursor)
+
+
+def object_etag(request, **objects):
+    """ETag из поколений объектов страницы, без тяжёлых запросов."""
+    keys = [feed_cache.BULK_GENERATION_KEY] + [
+        feed_cache.object_generation_key(name, pk)
+        for name, pk in objects.items() if pk is not None
+    ]
+    return feed_cache.make_etag(request, feed_cache.get_generations(keys))
+
 
-def get_page_object(posts, page_number):
-    paginator = Paginator(posts, settings.POSTS_DISPLAYED)
-    return paginator.get_page(page_number)
+def group_etag(request, slug):
+    group_id = Group.objects.filter(
+        slug=slug
+    ).values_list('pk', flat=True).first()
+    if group_id is not None:
+        return object_etag(
+            request, group=group_id, follower=request.user.pk
+        )
+
+
+def profile_etag(request, username):
+    author_id = User.objects.filter(
+        username=username
+    ).values_list('pk', flat=True).first()
+    if author_id is not None:
+        return object_etag(
+            request, author=author_id, follower=request.user.pk,
+            recommendations=request.user.pk
+        )
+
+
+def post_detail_etag(request, post_id):
+    post = Post.objects.filter(
+        pk=post_id
+    ).values_list('author_id', 'group_id').first()
+    if post is not None:
+        author_id, group_id = post
+        return object_etag(
+            request, post=post_id, author=author_id, group=group_id
+        )
 
 
+@query_budget(4)
 def index(request):
     posts = Post.objects.select_related('author', 'group')
 
-    page_number = request.GET.get('page')
-    page_obj = get_page_object(posts, page_number)
+    # Страница выбирается из базы, только если фрагмент не в кеше.
+    page_obj = SimpleLazyObject(lambda: get_page_object(posts, request))
 
     template = 'posts/index.html'
     context = {
         'page_obj': page_obj,
+        'feed_generation': feed_cache.get_generation(),
+        'feed_cache_timeout': settings.FEED_CACHE_TIMEOUT,
     }
-    return render(request, template, context)
+    response = render(request, template, context)
+    metrics.inc(
+        'yatube_index_cache_total',
+        result='hit' if page_obj._wrapped is empty else 'miss'
+    )
+    return response
 
 
+@query_budget(7)
+@condition(etag_func=group_etag)
 def group_posts(request, slug):
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
     posts = group.posts.select_related('author')
 
-    page_number = request.GET.get('page')
-    page_obj = get_page_object(posts, page_number)
+    page_obj = get_page_object(posts, request)
 
     context = {
         'group': group,
         'page_obj': page_obj,
+        'following_ids': follows.following_ids(request.user),
     }
     return render(request, template, context)
 
 
+@query_budget(7)
+@condition(etag_func=profile_etag)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related('stats'),
+        username=username
+    )
     posts = author.posts.select_related('group')
 
-    page_number = request.GET.get('page')
-    page_obj = get_page_object(posts, page_number)
-
-    is_follow = (
-        request.user.is_authenticated
-        and request.user.follower.filter(author__username=username).exists()
-    )
+    page_obj = get_page_object(posts, request)
 
     context = {
         'author': author,
         'page_obj': page_obj,
-        'following': is_follow,
-        'posts_number': page_obj.paginator.count,
+        'following': author.pk in follows.following_ids(request.user),
+        'recommendations': (
+            recommendations.for_user(request.user)
+            if author == request.user else []
+        ),
+        'posts_number': author.stats.posts_count,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@query_budget(6)
+@condition(etag_func=post_detail_etag)
 def post_detail(request, post_id):
     post = get_object_or_404(
-        Post.objects.select_related(
-            'group', 'author').prefetch_related(
-                Prefetch(
-                    'comments',
-                    queryset=Comment.objects.select_related('author')
-                )
-        ),
+        Post.objects.select_related('group', 'author__stats'),
         pk=post_id
     )
 
-    author_posts_number = post.author.posts.count()
+    author_posts_number = post.author.stats.posts_count
 
     context = {
         'form': CommentForm(),
         'post': post,
         'author_posts_number': author_posts_number,
+        'comments_page': get_comments_page(post, None),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@query_budget(5)
+@condition(etag_func=post_detail_etag)
+def post_comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments_page = get_comments_page(post, request.GET.get('cursor'))
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [
+                {
+                    'id': comment.pk,
+                    'author': comment.author.username,
+                    'text': comment.text,
+                    'created': comment.created.isoformat(),
+                }
+                for comment in comments_page
+            ],
+            'next_cursor': comments_page.paginator.next_cursor,
+        })
+
+    context = {
+        'post': post,
+        'comments_page': comments_page,
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
+@query_budget(5)
+def search_results(request):
+    query = request.GET.get('q', '').strip()
+    posts = search.search_posts(
+        Post.objects.select_related('author', 'group'), query
+    )
+
+    page_obj = get_page_object(posts, request) if query else None
+
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'following_ids': follows.following_ids(request.user),
+        # Префикс ссылок пагинатора, чтобы не терять запрос.
+        'page_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@staff_member_required
+def export(request):
+    data_format = request.GET.get('format', 'jsonl')
+    record_types = request.GET.getlist('type') or RECORD_TYPES
+    if data_format not in FORMATS or not set(record_types) <= set(
+        RECORD_TYPES
+    ):
+        return HttpResponseBadRequest('Неизвестный формат или тип записей')
+
+    # Строки формируются по мере отправки: память не растёт с объёмом.
+    response = StreamingHttpResponse(
+        exporter.export_lines(record_types, data_format),
+        content_type=EXPORT_CONTENT_TYPES[data_format]
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="yatube.{data_format}"'
+    )
+    return response
+
+
+@query_budget(9)
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None, request.FILES or None)
@@ -100,12 +274,15 @@ def post_create(request):
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
-        post.save()
+        with transaction.atomic():
+            post.save()
+            thumbnails.schedule_thumbnails(post)
         return redirect('posts:profile', post.author.username)
 
     return render(request, 'posts/create_post.html', context)
 
 
+@query_budget(5)
 @login_required
 def post_edit(request, post_id):
     post = get_object_or_404(
@@ -131,67 +308,74 @@ def post_edit(request, post_id):
     }
 
     if form.is_valid():
-        form.save()
+        with transaction.atomic():
+            form.save()
+            if 'image' in form.changed_data:
+                thumbnails.schedule_thumbnails(post)
         return redirect('posts:post_detail', post_id)
 
     return render(request, 'posts/create_post.html', context)
 
 
+@query_budget(8)
 @login_required
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    # Пост не загружается: хватает проверки id по первичному ключу.
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404('Нет такого поста')
 
     form = CommentForm(request.POST or None)
+    fragment = is_fragment_request(request)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
-        comment.post = post
-        comment.save()
+        comment.post_id = post_id
+        with transaction.atomic():
+            comment.save()
+        if fragment:
+            # Скрипту страницы поста нужен только новый комментарий.
+            return render(
+                request, 'posts/includes/comment.html',
+                {'comment': comment}, status=201
+            )
+    elif fragment:
+        return JsonResponse({'errors': form.errors}, status=400)
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@query_budget(5)
 @ login_required
 def follow_index(request):
-    posts = Post.objects.select_related().filter(
-        author__following__user=request.user)
+    entries = request.user.timeline.select_related(
+        'post__author', 'post__group'
+    )
 
-    page_number = request.GET.get('page')
-    page_obj = get_page_object(posts, page_number)
+    page_obj = get_page_object(entries, request, timeline=True)
 
     template = 'posts/follow.html'
     context = {
         'page_obj': page_obj,
+        'recommendations': recommendations.for_user(request.user),
     }
 
     return render(request, template, context)
 
 
-@ login_required
-def profile_follow(request, username):
-
-    is_follow = request.user.follower.filter(
-        author__username=username).exists()
-
-    author_user = User.objects.get(username=username)
+def get_author_id(username):
+    return get_object_or_404(
+        User.objects.values_list('pk', flat=True), username=username
+    )
 
-    if not is_follow and request.user != author_user:
-        follow = Follow.objects.create(
-            user=request.user,
-            author=User.objects.get(username=username)
-        )
-        follow.save()
 
+@query_budget(11)
+@ login_required
+def profile_follow(request, username):
+    follows.follow(request.user, get_author_id(username))
     return redirect('posts:profile', username=username)
 
 
+@query_budget(8)
 @ login_required
 def profile_unfollow(request, username):
-
-    follow = Follow.objects.filter(
-        user=request.user,
-        author__username=username
-    )
-
-    follow.delete()
-
+    follows.unfollow(request.user, get_author_id(username))
     return redirect('posts:profile', username=username)
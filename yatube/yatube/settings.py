@@ -10,11 +10,19 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
+import atexit
 import os
+import shutil
+import sys
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# Прогон тестов: общие с запущенным сервером каталоги (кеш, метрики)
+# заменяются временными.
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
@@ -37,6 +45,7 @@ ALLOWED_HOSTS = [
 
 INSTALLED_APPS = [
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'core.apps.CoreConfig',
     'posts.apps.PostsConfig',
     'django.contrib.admin',
@@ -49,11 +58,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.profiling.ProfilingMiddleware',
+    'core.slow_queries.SlowQueryMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -132,6 +144,12 @@ STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'), )
 STATIC_URL = '/static/'
 
 POSTS_DISPLAYED = 10
+COMMENTS_DISPLAYED = 20
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+FOLLOWING_CACHE_TIMEOUT = 60 * 60
+RECOMMENDATIONS_TOP = 20
+RECOMMENDATIONS_DISPLAYED = 5
+API_MAX_PAGE_SIZE = 100
 POST_SYMBOLS_DISPLAYED = 15
 
 LOGIN_URL = 'users:login'
@@ -145,8 +163,98 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Число фоновых потоков для миниатюр; 0 — создавать их в запросе.
+THUMBNAIL_WORKERS = 2
+
+# Профилирование запросов: доля случайно выбранных запросов
+# (0 — выключено) и срок жизни токена для заголовка X-Profile,
+# который выдаёт команда profiling_token.
+PROFILING_SAMPLE_RATE = float(os.environ.get('YATUBE_PROFILING_SAMPLE_RATE', 0))
+PROFILING_TOKEN_MAX_AGE = 60 * 60 * 12
+
+# Метрики для /metrics: каждый процесс сервера раз в интервал пишет
+# свои значения в файл каталога, страница складывает их.
+METRICS_DIR = os.environ.get(
+    'YATUBE_METRICS_DIR',
+    os.path.join(tempfile.gettempdir(), 'yatube_metrics')
+)
+if TESTING:
+    # Иначе запросы тестов попали бы в счётчики сервера разработки.
+    METRICS_DIR = tempfile.mkdtemp(prefix='yatube_test_metrics_')
+    atexit.register(shutil.rmtree, METRICS_DIR, ignore_errors=True)
+METRICS_FLUSH_INTERVAL = 1
+# Адреса сборщика метрик, которым /metrics отдаётся без входа;
+# остальным — только сотрудникам.
+METRICS_ALLOWED_IPS = os.environ.get('YATUBE_METRICS_ALLOWED_IPS', '').split()
+
+# Запросы к базе дольше порога (в секундах) сохраняются с планом
+# в админку «Медленные запросы»; None — выключено.
+SLOW_QUERY_THRESHOLD = 0.1
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'core.slow_queries': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
+# Cache
+# Кеш должен быть общим для всех процессов сервера, иначе каждый
+# воркер держит свою копию ленты и не видит сбросов кеша в других.
+# Бэкенд выбирается переменной окружения YATUBE_CACHE; в продакшене
+# используйте redis (нужен пакет django-redis).
+
+CACHE_DIR = os.environ.get(
+    'YATUBE_CACHE_DIR', os.path.join(BASE_DIR, 'cache')
+)
+# Тесты очищают кеш: у каждого прогона свой каталог, иначе они стирали
+# бы кеш запущенного сервера разработки.
+if TESTING:
+    CACHE_DIR = tempfile.mkdtemp(prefix='yatube_test_cache_')
+    atexit.register(shutil.rmtree, CACHE_DIR, ignore_errors=True)
+
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'file': {
+        'BACKEND': 'core.cache.CullingFileCache',
+        'LOCATION': CACHE_DIR,
+        'OPTIONS': {
+            # По умолчанию Django хранит 300 записей: счётчики поколений
+            # и миниатюры sorl вытеснялись бы при обычной нагрузке.
+            'MAX_ENTRIES': 200000,
+            'CULL_EVERY': 100,
+        },
+    },
+    'sqlite': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'yatube_cache',
+    },
+    'redis': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'),
+    },
+}
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        **CACHE_BACKENDS[os.environ.get('YATUBE_CACHE', 'file')],
+        'KEY_PREFIX': 'yatube',
     }
 }